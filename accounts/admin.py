@@ -2,11 +2,25 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
+from core.exports import export_as_csv, export_as_jsonl
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 
 User = get_user_model()
 
 
+def set_role_action(role):
+    """Действие админки: назначить роль выбранным пользователям одним UPDATE"""
+    label = User.Role(role).label
+
+    @admin.action(description=f'Назначить роль: {label}')
+    def action(modeladmin, request, queryset):
+        count = queryset.set_role(role)
+        modeladmin.message_user(request, f'Роль «{label}» назначена пользователям: {count}')
+
+    action.__name__ = f'set_role_{role}'
+    return action
+
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     """
@@ -24,6 +38,7 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ('role', 'is_active', 'is_staff', 'date_joined')
     search_fields = ('username', 'email', 'first_name', 'last_name', 'phone')
     ordering = ('-date_joined',)
+    actions = (*(set_role_action(role) for role in User.Role.values), export_as_csv, export_as_jsonl)
     
     # Поля для формы добавления/редактирования
     fieldsets = (
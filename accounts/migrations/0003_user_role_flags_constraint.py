@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:43
+
+import accounts.models
+from django.db import migrations, models
+
+
+# Флаги по ролям — как в User.role_flags на момент миграции
+ROLE_FLAGS = {
+    'admin': (True, True),
+    'content_manager': (True, False),
+    'crm_manager': (True, False),
+}
+
+
+def normalize_role_flags(apps, schema_editor):
+    """Приводит флаги существующих пользователей к роли, иначе ограничение не создастся"""
+    User = apps.get_model('accounts', 'User')
+    for role, (is_staff, is_superuser) in ROLE_FLAGS.items():
+        User.objects.filter(role=role).exclude(is_staff=is_staff, is_superuser=is_superuser).update(
+            is_staff=is_staff, is_superuser=is_superuser
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options_remove_user_patronymic_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', accounts.models.UserManager()),
+            ],
+        ),
+        migrations.RunPython(normalize_role_flags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('is_staff', True), ('is_superuser', True), ('role', 'admin')), models.Q(('is_staff', True), ('is_superuser', False), ('role__in', ['content_manager', 'crm_manager'])), _connector='OR'), name='accounts_user_role_flags', violation_error_message='Флаги is_staff/is_superuser не соответствуют роли'),
+        ),
+    ]
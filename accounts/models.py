@@ -1,8 +1,34 @@
-from django.contrib.auth.models import AbstractUser
+import logging
+
+from django.contrib.auth.models import AbstractUser, UserManager as AuthUserManager
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 
+logger = logging.getLogger(__name__)
+
+
+class UserQuerySet(models.QuerySet):
+
+    def set_role(self, role):
+        """
+        Меняет роль всем пользователям выборки одним UPDATE, без загрузки
+        и save() каждой записи. Флаги выставляются по тому же правилу (User.role_flags).
+        Возвращает количество изменённых записей.
+        """
+        if role not in self.model.Role.values:
+            raise ValueError(f'Неизвестная роль: {role}')
+        is_staff, is_superuser = self.model.role_flags(role)
+        count = self.update(role=role, is_staff=is_staff, is_superuser=is_superuser)
+        logger.info('Роль %s назначена пользователям: %d', role, count)
+        return count
+
+
+class UserManager(AuthUserManager.from_queryset(UserQuerySet)):
+    """Стандартный менеджер пользователей (create_user, create_superuser) с методами UserQuerySet"""
+
+
 class User(AbstractUser):
     """
     Кастомная модель пользователя с ролями.
@@ -35,14 +61,52 @@ class User(AbstractUser):
         }
     )
     
+    objects = UserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['-date_joined']
+        constraints = [
+            # То же правило, что в role_flags: роль определяет флаги и в базе,
+            # queryset.update(role=...) без флагов не пройдёт
+            models.CheckConstraint(
+                condition=(
+                    Q(role='admin', is_staff=True, is_superuser=True)
+                    | Q(role__in=['content_manager', 'crm_manager'], is_staff=True, is_superuser=False)
+                ),
+                name='accounts_user_role_flags',
+                violation_error_message='Флаги is_staff/is_superuser не соответствуют роли',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
     
+    @classmethod
+    def role_flags(cls, role):
+        """
+        Флаги (is_staff, is_superuser) для роли.
+        Используется в save() и там, где записи создаются в обход save()
+        (например, manage.py seed_data).
+        """
+        # Роль ADMIN -> is_staff=True, is_superuser=True
+        if role == cls.Role.ADMIN:
+            return True, True
+        # Роль CONTENT_MANAGER или CRM_MANAGER -> is_staff=True, is_superuser=False
+        if role in (cls.Role.CONTENT_MANAGER, cls.Role.CRM_MANAGER):
+            return True, False
+        # На всякий случай (если вдруг роль какая-то другая)
+        return False, False
+    
+    def clean(self):
+        """
+        Флаги приводятся к роли до проверки ограничений (full_clean в формах),
+        иначе смена роли в админке упиралась бы в accounts_user_role_flags.
+        """
+        super().clean()
+        self.is_staff, self.is_superuser = self.role_flags(self.role)
+
     def save(self, *args, **kwargs):
         """
         Автоматически устанавливаем is_staff и is_superuser в зависимости от роли.
@@ -71,23 +135,10 @@ class User(AbstractUser):
             # Значит, пользователь создаётся через createsuperuser
             # Меняем роль на ADMIN, так как суперпользователь должен быть администратором
             self.role = self.Role.ADMIN
-            print(f'[DEBUG] Суперпользователь {self.username} автоматически получил роль ADMIN')
-        
-        # ШАГ 2: Устанавливаем флаги в соответствии с ролью
-        # Роль ADMIN -> is_staff=True, is_superuser=True
-        if self.role == self.Role.ADMIN:
-            self.is_staff = True
-            self.is_superuser = True
+            logger.debug('Суперпользователь %s автоматически получил роль ADMIN', self.username)
         
-        # Роль CONTENT_MANAGER или CRM_MANAGER -> is_staff=True, is_superuser=False
-        elif self.role in [self.Role.CONTENT_MANAGER, self.Role.CRM_MANAGER]:
-            self.is_staff = True
-            self.is_superuser = False
-        
-        # На всякий случай (если вдруг роль какая-то другая)
-        else:
-            self.is_staff = False
-            self.is_superuser = False
+        # ШАГ 2: Устанавливаем флаги в соответствии с ролью (правило — в role_flags)
+        self.is_staff, self.is_superuser = self.role_flags(self.role)
         
         # ШАГ 3: Валидация — если флаги не соответствуют роли, но роль указана явно,
         # мы уже исправили флаги выше. Но если флаги были установлены вручную,
@@ -106,7 +157,7 @@ class User(AbstractUser):
                 username = f"{base_username}{counter}"
                 counter += 1
             self.username = username
-            print(f'[DEBUG] Для пользователя {self.email} автоматически создан username: {self.username}')
+            logger.debug('Для пользователя %s автоматически создан username: %s', self.email, self.username)
         
         # ШАГ 5: Вызов родительского метода save
         super().save(*args, **kwargs)
@@ -118,7 +169,7 @@ class User(AbstractUser):
         """
         self.role = self.Role.ADMIN
         self.save()  # save() сам выставит правильные флаги
-        print(f'Пользователь {self.username} повышен до администратора')
+        logger.info('Пользователь %s повышен до администратора', self.username)
     
     def demote_to_content_manager(self):
         """
@@ -126,7 +177,7 @@ class User(AbstractUser):
         """
         self.role = self.Role.CONTENT_MANAGER
         self.save()
-        print(f'Пользователь {self.username} понижен до контент-менеджера')
+        logger.info('Пользователь %s понижен до контент-менеджера', self.username)
     
     def demote_to_crm_manager(self):
         """
@@ -134,4 +185,4 @@ class User(AbstractUser):
         """
         self.role = self.Role.CRM_MANAGER
         self.save()
-        print(f'Пользователь {self.username} понижен до CRM-менеджера')
\ No newline at end of file
+        logger.info('Пользователь %s понижен до CRM-менеджера', self.username)
\ No newline at end of file
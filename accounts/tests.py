@@ -1,3 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+class RoleFlagsTests(TestCase):
+
+    def create_users(self, prefix):
+        return [
+            User.objects.create_user(f'{prefix}{i}', f'{prefix}{i}@example.com', role=role)
+            for i, role in enumerate(User.Role.values)
+        ]
+
+    def flags(self, users):
+        return [
+            (user.role, user.is_staff, user.is_superuser)
+            for user in User.objects.filter(pk__in=[user.pk for user in users]).order_by('pk')
+        ]
+
+    def test_bulk_and_per_row_paths_agree(self):
+        for role in User.Role.values:
+            per_row = self.create_users(f'row-{role}-')
+            for user in per_row:
+                user.role = role
+                user.save()
+
+            bulk = self.create_users(f'bulk-{role}-')
+            with self.assertNumQueries(1):
+                User.objects.filter(pk__in=[user.pk for user in bulk]).set_role(role)
+
+            self.assertEqual(self.flags(bulk), self.flags(per_row))
+
+    def test_database_rejects_inconsistent_flags(self):
+        user = User.objects.create_user('plain', 'plain@example.com', role=User.Role.CONTENT_MANAGER)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.filter(pk=user.pk).update(role=User.Role.ADMIN)
@@ -54,11 +54,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.postgres',
+    'solo',
     'core',
+    'accounts',
 ]
 
+AUTH_USER_MODEL = 'accounts.User'
+
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -101,6 +108,126 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения (необязательно).
+# DB_REPLICA_HOSTS — список хостов через запятую, например:
+# DB_REPLICA_HOSTS=replica1.local,replica2.local:5433
+# Остальные параметры подключения совпадают с основной базой,
+# если не заданы DB_REPLICA_USER / DB_REPLICA_PASSWORD.
+DATABASE_REPLICAS = []
+
+for index, replica_host in enumerate(
+    filter(None, (host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(','))),
+    start=1
+):
+    host, _, port = replica_host.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        # В тестах реплика смотрит в ту же тестовую базу, что и default
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Модели, чтение которых можно отправлять на реплики
+REPLICA_ROUTED_MODELS = ['core.Image', 'core.File', 'accounts.User']
+
+# Сколько секунд после записи пользователь читает только с основной базы
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '5'))
+
+# В тестах чтения идут на основную базу, тесты реплик включают их сами
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Кэш
+# default — общий для всех процессов уровень: файловый по умолчанию или база
+# (CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache, CACHE_LOCATION=имя таблицы,
+# затем manage.py createcachetable). local — кэш в памяти процесса перед ним
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('LOCAL_CACHE_MAX_ENTRIES', '1000'))},
+    },
+}
+
+# Кэш страниц с суррогатными ключами (core.page_cache)
+PAGE_CACHE_SHARED = 'default'
+PAGE_CACHE_LOCAL = 'local'
+# Сколько секунд хранить ответ в общем кэше и в памяти процесса
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', str(60 * 60)))
+PAGE_CACHE_LOCAL_TIMEOUT = int(os.environ.get('PAGE_CACHE_LOCAL_TIMEOUT', '60'))
+
+# Кэш настроек сайта (core.site_config)
+# Алиас общего кэша, в котором хранится версия и сам объект настроек
+SITE_CONFIG_CACHE = 'default'
+# Как часто (в секундах) процесс сверяет свою копию настроек с общим кэшем
+SITE_CONFIG_LOCAL_TTL = int(os.environ.get('SITE_CONFIG_LOCAL_TTL', '5'))
+
+# Секционирование таблиц медиа по месяцам (manage.py partition_media)
+# На сколько месяцев вперёд заранее создавать секции
+MEDIA_PARTITION_MONTHS_AHEAD = int(os.environ.get('MEDIA_PARTITION_MONTHS_AHEAD', '3'))
+# Через сколько дней неактивные записи уходят в архивные секции
+MEDIA_ARCHIVE_AFTER_DAYS = int(os.environ.get('MEDIA_ARCHIVE_AFTER_DAYS', '365'))
+# Табличное пространство для архивных секций (например, на дешёвом диске)
+MEDIA_ARCHIVE_TABLESPACE = os.environ.get('MEDIA_ARCHIVE_TABLESPACE') or None
+
+
+# Декодирование изображений (core.imaging)
+# Сколько памяти процесс может одновременно отдать под растры декодируемых изображений
+IMAGE_DECODE_MEMORY_BUDGET_MB = int(os.environ.get('IMAGE_DECODE_MEMORY_BUDGET_MB', '512'))
+# Сколько секунд ждать свободного места в бюджете, прежде чем отложить задачу
+IMAGE_DECODE_TIMEOUT = float(os.environ.get('IMAGE_DECODE_TIMEOUT', '30'))
+
+# Перекодирование изображений в WebP/AVIF (manage.py reencode_images)
+# Оставлять исходные файлы на диске после замены
+IMAGE_REENCODE_KEEP_ORIGINALS = os.environ.get('IMAGE_REENCODE_KEEP_ORIGINALS', 'True') == 'True'
+
+
+# Учёт SQL-запросов (core.query_stats, core.middleware.QueryStatsMiddleware)
+# Добавлять заголовки X-DB-Queries и Server-Timing в ответы
+QUERY_STATS_HEADERS = os.environ.get('QUERY_STATS_HEADERS', str(DEBUG)) == 'True'
+# Доля запросов, статистика которых пишется в лог вне DEBUG
+QUERY_STATS_SAMPLE_RATE = float(os.environ.get('QUERY_STATS_SAMPLE_RATE', '0.01'))
+# Сколько одинаковых запросов за HTTP-запрос считать признаком N+1
+QUERY_STATS_NPLUSONE_THRESHOLD = int(os.environ.get('QUERY_STATS_NPLUSONE_THRESHOLD', '5'))
+
+
+# Метрики Prometheus (core.metrics), эндпоинт /metrics
+# Адреса и подсети, которым разрешено читать метрики напрямую (не через прокси)
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+# Токен для Authorization: Bearer. Если задан, адрес не проверяется — обязателен за прокси
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Первый обработчик только считает байты и время загрузки, файл сохраняют стандартные
+FILE_UPLOAD_HANDLERS = [
+    'core.metrics.MetricsUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+
+# Фоновые задачи (django.tasks)
+# Задачи хранятся в базе и выполняются командой manage.py run_tasks
+TASKS = {
+    'default': {
+        'BACKEND': 'core.task_backend.DatabaseBackend',
+        'QUEUES': ['default'],
+        'OPTIONS': {
+            'MAX_ATTEMPTS': 3,
+            'RETRY_DELAY': 30,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -137,9 +264,72 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+# Куда collectstatic собирает файлы (имена с хешем, сжатые .gz/.br рядом)
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+# Хешированные имена и сжатие (core.static_assets). В разработке выключено:
+# манифест появляется только после collectstatic
+STATIC_MANIFEST = os.environ.get('STATIC_MANIFEST', str(not DEBUG)) == 'True'
+# Отдавать статику из приложения (core.static_assets.serve_static); выключить, если её отдаёт nginx
+STATIC_SERVE = os.environ.get('STATIC_SERVE', 'True') == 'True'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'core.static_assets.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 
 
 # Media files (загруженные пользователем файлы)
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Логирование
+# Запись в поток вывода идёт из отдельного потока (QueueHandler -> QueueListener),
+# поток запроса только кладёт запись в очередь. Слушатель очереди запускается
+# в CoreConfig.ready() — в каждом процессе (воркере gunicorn, обработчике задач),
+# а после fork (gunicorn --preload) заново в дочернем процессе.
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Поля extra= дописываются после сообщения в виде key=value
+        'structured': {
+            'class': 'core.logfmt.LogfmtFormatter',
+            'format': '{asctime} level={levelname} logger={name} pid={process:d} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+        'queue': {
+            'class': 'logging.handlers.QueueHandler',
+            'handlers': ['console'],
+            'respect_handler_level': True,
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
@@ -1,12 +1,25 @@
+import re
+
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics_view
+from core.static_assets import serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
+# Статика со сжатием и долгим кэшем, если перед приложением нет nginx
+if settings.STATIC_SERVE:
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.STATIC_URL.lstrip("/"))}(?P<path>.+)$', serve_static, name='static'),
+    ]
+
 # Обработка media файлов только в режиме разработки
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
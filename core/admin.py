@@ -1,6 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
-from .models import Image, File
+from solo.admin import SingletonModelAdmin
+from . import page_cache, storage_stats
+from .exports import export_as_csv, export_as_jsonl
+from .models import Image, File, QueuedTask, SiteConfiguration, StorageUsage
+from .tasks import process_image
 
 
 @admin.register(Image)
@@ -10,15 +16,21 @@ class ImageAdmin(admin.ModelAdmin):
         'dimensions_display', 'file_size_display', 'is_active', 'created_at'
     )
     list_display_links = ('thumbnail_preview', 'id', 'title')
-    list_filter = ('file_type', 'is_active', 'created_at')
+    list_filter = ('file_type', 'is_active', 'processing_status', 'created_at')
     search_fields = ('title', 'alt_text')
-    readonly_fields = ('width', 'height', 'file_size', 'file_type', 'created_at', 'updated_at', 'image_preview')
+    readonly_fields = (
+        'width', 'height', 'file_size', 'file_type', 'processing_status',
+        'placeholder', 'dominant_color', 'created_at', 'updated_at', 'image_preview'
+    )
     fieldsets = (
         ('Основное', {
             'fields': ('image', 'image_preview', 'title', 'alt_text')
         }),
         ('Метаданные файла', {
-            'fields': ('file_type', ('width', 'height'), 'file_size'),
+            'fields': (
+                'file_type', ('width', 'height'), 'file_size', 'processing_status',
+                ('placeholder', 'dominant_color')
+            ),
             'classes': ('wide',)
         }),
         ('Статус и даты', {
@@ -26,6 +38,20 @@ class ImageAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    actions = ('reprocess_images', export_as_csv, export_as_jsonl)
+
+    @admin.action(description='Пересчитать размеры и заглушки')
+    def reprocess_images(self, request, queryset):
+        """Ставит выбранные изображения (кроме SVG) в очередь на повторную обработку"""
+        images = list(queryset.exclude(file_type='SVG').values_list('pk', 'image'))
+        queryset.filter(pk__in=[pk for pk, _ in images]).update(
+            processing_status=Image.ProcessingStatus.PENDING
+        )
+        # update() минует сигналы — статус обработки виден в API, сбрасываем кэш страниц сами
+        keys = [f'image:{pk}' for pk, _ in images] + ['image-list']
+        transaction.on_commit(lambda: page_cache.purge(*keys))
+        transaction.on_commit(lambda: [process_image.enqueue(pk, name) for pk, name in images])
+        self.message_user(request, f'Поставлено в очередь: {len(images)}')
 
     def thumbnail_preview(self, obj):
         """Превью изображения в списке"""
@@ -92,6 +118,7 @@ class FileAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    actions = (export_as_csv, export_as_jsonl)
 
     def file_link(self, obj):
         """Ссылка на файл"""
@@ -129,4 +156,66 @@ class FileAdmin(admin.ModelAdmin):
             else:
                 return f'{size / (1024 * 1024):.1f} МБ'
         return '—'
-    file_size_display.short_description = 'Размер'
\ No newline at end of file
+    file_size_display.short_description = 'Размер'
+
+
+@admin.register(StorageUsage)
+class StorageUsageAdmin(admin.ModelAdmin):
+    """
+    Страница статистики хранилища вместо обычного списка.
+    Читает только таблицу счётчиков, поэтому не зависит от числа файлов.
+    """
+    change_list_template = 'admin/core/storageusage/dashboard.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Статистика хранилища',
+            'opts': self.model._meta,
+            **storage_stats.dashboard_data(),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, self.change_list_template, context)
+
+
+@admin.register(SiteConfiguration)
+class SiteConfigurationAdmin(SingletonModelAdmin):
+    fieldsets = (
+        ('Основное', {
+            'fields': ('site_name',)
+        }),
+        ('Контакты', {
+            'fields': ('contact_email', 'contact_phone', 'address')
+        }),
+        ('Загрузка файлов', {
+            'fields': ('max_image_size_mb', 'max_image_pixels', 'max_file_size_mb')
+        }),
+    )
+
+
+@admin.register(QueuedTask)
+class QueuedTaskAdmin(admin.ModelAdmin):
+    """Просмотр очереди фоновых задач"""
+    list_display = ('id', 'task_path', 'queue_name', 'priority', 'status', 'attempts', 'enqueued_at', 'finished_at')
+    list_filter = ('status', 'queue_name', 'task_path')
+    readonly_fields = [field.name for field in QueuedTask._meta.fields]
+    actions = ('retry_tasks',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Перезапустить выбранные задачи')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status=QueuedTask.Status.RUNNING).update(
+            status=QueuedTask.Status.READY, run_after=None, finished_at=None, worker_ids=[]
+        )
+        self.message_user(request, f'Задач поставлено в очередь: {updated}')
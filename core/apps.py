@@ -1,10 +1,60 @@
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueListener
+
 from django.apps import AppConfig
 
 
+# Слушатель очереди логов, запущенный в этом процессе, и pid процесса, который его запустил
+_log_listener = None
+_log_listener_pid = None
+
+
+def start_log_listener():
+    """
+    Запускает слушателя очереди логов: dictConfig его создаёт, но не запускает.
+    После fork (gunicorn --preload) поток слушателя остаётся в родителе, поэтому
+    дочерний процесс получает своего слушателя со своей очередью.
+    """
+    global _log_listener, _log_listener_pid
+    if _log_listener_pid == os.getpid():
+        return
+    queue_handler = logging.getHandlerByName('queue')
+    listener = getattr(queue_handler, 'listener', None)
+    if listener is None:
+        return
+    if _log_listener_pid is not None:
+        # Унаследованная очередь могла остаться заблокированной потоком родителя
+        queue_handler.queue = queue.Queue(-1)
+        listener = queue_handler.listener = QueueListener(
+            queue_handler.queue, *listener.handlers, respect_handler_level=listener.respect_handler_level
+        )
+    listener.start()
+    _log_listener, _log_listener_pid = listener, os.getpid()
+
+
+def stop_log_listener():
+    """Дописывает оставшиеся в очереди записи и останавливает слушателя этого процесса"""
+    global _log_listener, _log_listener_pid
+    if _log_listener_pid == os.getpid():
+        _log_listener.stop()
+        _log_listener = _log_listener_pid = None
+
+
+atexit.register(stop_log_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=start_log_listener)
+
+
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Ядро системы'
 
     def ready(self):
-        import core.signals
\ No newline at end of file
+        import core.query_stats
+        import core.signals
+
+        start_log_listener()
@@ -0,0 +1,254 @@
+"""
+Замеры производительности для manage.py benchmark.
+
+Каждый замер сам готовит данные нужного объёма (scale строк) в тестовой
+базе, выполняет операцию repeat раз и возвращает словарь
+{имя результата: статистика}. Статистика — времена в секундах
+(min/median/mean/max) и число SQL-запросов на одну операцию:
+по ним и сравниваются результаты разных коммитов (compare_results).
+"""
+import io
+import itertools
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.tasks import default_task_backend
+from django.test import Client
+from django.urls import reverse
+from PIL import Image as PilImage
+
+from . import storage_stats
+from .models import File, Image
+from .query_stats import collect_queries
+
+
+BENCHMARKS = {}
+
+# Форматы и размеры для замера Image.save и фоновой обработки
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+IMAGE_SIZES = ((640, 480), (4000, 3000))
+
+# Сколько пользователей уже занимают username, выводимый из email
+USERNAME_COLLISIONS = 10
+
+ADMIN_CHANGELISTS = (
+    'admin:core_image_changelist',
+    'admin:core_file_changelist',
+    'admin:accounts_user_changelist',
+    'admin:core_storageusage_changelist',
+)
+
+SEED_BATCH_SIZE = 2000
+
+
+def benchmark(name):
+    """Регистрирует функцию замера под именем name"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def summarize(timings, queries=None, **extra):
+    """Статистика по списку времён одной операции"""
+    result = {
+        'runs': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+    }
+    if queries is not None:
+        result['queries'] = queries
+    result.update(extra)
+    return result
+
+
+def measure(func, repeat):
+    """Выполняет func repeat раз: (времена, SQL-запросов на один вызов)"""
+    timings = []
+    with collect_queries() as collector:
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started_at)
+    return timings, collector.count // repeat
+
+
+def image_bytes(image_format, size):
+    """Тестовое изображение: градиент сжимается примерно как фотография, а не как заливка"""
+    image = PilImage.radial_gradient('L').resize(size).convert('RGB')
+    if image_format == 'GIF':
+        image = image.convert('P')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def seed_images(count):
+    Image.objects.bulk_create(
+        (
+            Image(
+                image=f'images/bench/{i}.jpg', title=f'Изображение {i}', file_type='JPEG',
+                file_size=100_000 + i, width=1280, height=720, is_active=i % 10 != 0,
+            )
+            for i in range(count)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+def seed_files(count):
+    File.objects.bulk_create(
+        (
+            File(
+                file=f'files/bench/{i}.pdf', name=f'Документ {i}', file_type='PDF',
+                file_size=50_000 + i, is_active=i % 10 != 0,
+            )
+            for i in range(count)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+def seed_users(count):
+    User = get_user_model()
+    # bulk_create минует save() — флаги по роли выставляем сами (ограничение accounts_user_role_flags)
+    role = User.Role.CONTENT_MANAGER
+    is_staff, is_superuser = User.role_flags(role)
+    User.objects.bulk_create(
+        (
+            User(
+                username=f'user{i}', email=f'user{i}@example.com', password='!',
+                role=role, is_staff=is_staff, is_superuser=is_superuser,
+            )
+            for i in range(count)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+def run_queued_tasks():
+    """Выполняет все готовые задачи очереди: {id задачи: время выполнения}"""
+    timings = {}
+    for task_id in default_task_backend.claim('benchmark', ['default'], 1000):
+        started_at = time.perf_counter()
+        default_task_backend.run(task_id)
+        timings[task_id] = time.perf_counter() - started_at
+    return timings
+
+
+@benchmark('image_save')
+def bench_image_save(scale, repeat):
+    """Image.save для разных форматов и размеров и фоновая обработка загруженного"""
+    seed_images(scale)
+    results = {}
+    for image_format, extension in IMAGE_FORMATS.items():
+        for width, height in IMAGE_SIZES:
+            data = image_bytes(image_format, (width, height))
+            label = f'{image_format} {width}x{height}'
+
+            timings, queries = measure(
+                lambda: Image.objects.create(image=SimpleUploadedFile(f'bench.{extension}', data)),
+                repeat,
+            )
+            results[f'image_save[{label}]'] = summarize(timings, queries, bytes=len(data))
+
+            processing = list(run_queued_tasks().values())
+            results[f'image_process[{label}]'] = summarize(processing)
+    return results
+
+
+@benchmark('bulk_delete')
+def bench_bulk_delete(scale, repeat):
+    """Массовое удаление документов через сигналы (файлы в очередь, счётчики StorageUsage)"""
+    timings = []
+    for _ in range(repeat):
+        seed_files(scale)
+        storage_stats.rebuild()
+        with collect_queries() as collector:
+            started_at = time.perf_counter()
+            File.objects.all().delete()
+            timings.append(time.perf_counter() - started_at)
+    median = statistics.median(timings)
+    return {
+        'bulk_delete': summarize(
+            timings, collector.count, rows=scale, rows_per_second=scale / median if median else None,
+        ),
+    }
+
+
+@benchmark('user_save')
+def bench_user_save(scale, repeat):
+    """User.save с генерацией username из email при занятых вариантах"""
+    User = get_user_model()
+    seed_users(scale)
+    is_staff, is_superuser = User.role_flags(User.Role.CONTENT_MANAGER)
+    User.objects.bulk_create(
+        User(
+            username='bench' if i == 0 else f'bench{i}', email=f'bench{i}@example.com', password='!',
+            is_staff=is_staff, is_superuser=is_superuser,
+        )
+        for i in range(USERNAME_COLLISIONS)
+    )
+    # email уникален, поэтому меняем домен: username всё равно выводится из «bench»
+    domains = itertools.count()
+    timings, queries = measure(lambda: User(email=f'bench@example{next(domains)}.com').save(), repeat)
+    return {'user_save[username_from_email]': summarize(timings, queries)}
+
+
+@benchmark('admin_changelist')
+def bench_admin_changelist(scale, repeat):
+    """Время отрисовки списков админки на таблицах заданного размера"""
+    seed_images(scale)
+    seed_files(scale)
+    seed_users(scale)
+    storage_stats.rebuild()
+
+    admin_user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'password')
+    client = Client()
+    client.force_login(admin_user)
+
+    results = {}
+    for url_name in ADMIN_CHANGELISTS:
+        url = reverse(url_name)
+
+        def render():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} ответил {response.status_code}')
+
+        # Первый запрос прогревает шаблоны и кэши — в замер не входит
+        render()
+        timings, queries = measure(render, repeat)
+        results[f'admin_changelist[{url_name.split(":")[1]}]'] = summarize(timings, queries)
+    return results
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Сравнивает два отчёта по медиане времени и числу запросов.
+    Возвращает (строки отчёта, список регрессий).
+    Регрессия — медиана выросла больше чем на threshold (доля) или стало больше запросов.
+    """
+    lines = []
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            lines.append(f'{name}: новый замер, медиана {result["median"] * 1000:.2f} мс')
+            continue
+
+        change = result['median'] / old['median'] - 1 if old['median'] else 0.0
+        line = f'{name}: {old["median"] * 1000:.2f} -> {result["median"] * 1000:.2f} мс ({change:+.1%})'
+        regressed = change > threshold
+        if result.get('queries') is not None and old.get('queries') is not None:
+            line += f', запросов {old["queries"]} -> {result["queries"]}'
+            regressed = regressed or result['queries'] > old['queries']
+        if regressed:
+            line += '  РЕГРЕССИЯ'
+            regressions.append(name)
+        lines.append(line)
+    return lines, regressions
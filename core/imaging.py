@@ -0,0 +1,129 @@
+"""
+Декодирование изображений с ограничением памяти.
+
+Все разборы загруженных изображений идут через этот модуль:
+- read_size() читает только заголовок файла — растр в память не попадает;
+- decode() перед декодированием включает draft-режим JPEG (декодер сразу
+  уменьшает картинку в 2/4/8 раз через DCT), оценивает объём растра
+  и резервирует его в общем бюджете процесса (IMAGE_DECODE_MEMORY_BUDGET_MB).
+
+Бюджет — семафор на байты, общий для всех потоков процесса (пул потоков
+run_tasks). Если места нет, decode() ждёт освобождения до
+IMAGE_DECODE_TIMEOUT секунд, затем DecodeBudgetTimeout — задача повторится
+позже. Изображение, которое не помещается в бюджет даже одно, отклоняется
+сразу (ImageTooLarge). Так пик памяти процесса ограничен при любом числе
+одновременных загрузок; при --pool process бюджет у каждого процесса свой.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class InvalidImage(Exception):
+    """Файл не является изображением, которое можно разобрать"""
+
+
+class ImageTooLarge(InvalidImage):
+    """Растр изображения больше всего бюджета памяти"""
+
+
+class DecodeBudgetTimeout(Exception):
+    """Бюджет памяти занят дольше IMAGE_DECODE_TIMEOUT"""
+
+
+class MemoryBudget:
+    """
+    Семафор на оценочный объём декодированных растров.
+    limit=None — лимит берётся из настроек при каждом резервировании.
+    """
+
+    def __init__(self, limit=None):
+        self._limit = limit
+        self._condition = threading.Condition()
+        self.used = 0
+
+    @property
+    def limit(self):
+        if self._limit is not None:
+            return self._limit
+        return settings.IMAGE_DECODE_MEMORY_BUDGET_MB * 1024 * 1024
+
+    @contextmanager
+    def reserve(self, amount, timeout=None):
+        """Занимает amount байт на время блока, при нехватке ждёт не дольше timeout секунд"""
+        limit = self.limit
+        if amount > limit:
+            raise ImageTooLarge(f'Растр {amount} байт больше бюджета памяти {limit} байт')
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.used + amount <= limit, timeout):
+                raise DecodeBudgetTimeout(f'Нет {amount} байт в бюджете памяти за {timeout} с')
+            self.used += amount
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= amount
+                self._condition.notify_all()
+
+
+# Общий бюджет процесса
+budget = MemoryBudget()
+
+
+def decoded_size(size, mode):
+    """
+    Оценка памяти под растр Pillow: многоканальные режимы хранятся
+    по 4 байта на пиксель (RGB тоже), одноканальные 8-битные — по одному.
+    """
+    width, height = size
+    if mode.startswith('I;16'):
+        bytes_per_pixel = 2
+    elif mode in ('1', 'L', 'P'):
+        bytes_per_pixel = 1
+    else:
+        bytes_per_pixel = 4
+    return width * height * bytes_per_pixel
+
+
+@contextmanager
+def open_image(file):
+    """Открывает изображение без декодирования пикселей (читается только заголовок)"""
+    from PIL import Image as PilImage, UnidentifiedImageError
+
+    try:
+        img = PilImage.open(file)
+    except (UnidentifiedImageError, PilImage.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    with img:
+        yield img
+
+
+def read_size(file):
+    """(ширина, высота) из заголовка файла; позиция в файле возвращается в начало"""
+    try:
+        with open_image(file) as img:
+            return img.size
+    finally:
+        file.seek(0)
+
+
+@contextmanager
+def decode(img, size=None, timeout=None):
+    """
+    Декодирует открытое изображение в пределах бюджета памяти.
+    size — сколько на самом деле нужно (например, для миниатюры): JPEG тогда
+    декодируется сразу в уменьшенном масштабе. Размеры оригинала нужно прочитать
+    до вызова. После блока растр освобождается (изображение закрывается).
+    """
+    if size:
+        img.draft(None, size)
+    if timeout is None:
+        timeout = settings.IMAGE_DECODE_TIMEOUT
+    with budget.reserve(decoded_size(img.size, img.mode), timeout):
+        try:
+            img.load()
+            yield img
+        finally:
+            # Растр освобождается до того, как место вернётся в бюджет
+            img.close()
@@ -0,0 +1,38 @@
+"""
+Формат логов key=value (logfmt), который разбирают Loki, Vector и grep.
+
+Строка собирается по обычному шаблону форматтера (format в LOGGING),
+затем дописываются поля, переданные через extra=:
+
+    logger.info('Удалено файлов: %d', removed, extra={'files_removed': removed})
+    2026-10-18 12:00:00,000 level=INFO logger=core.tasks pid=42 Удалено файлов: 3 files_removed=3
+
+Модуль подключается из LOGGING до загрузки приложений, поэтому Django не импортирует.
+"""
+import json
+import logging
+
+
+# Атрибуты, которые есть у любой записи; всё остальное пришло через extra=
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def format_value(value):
+    """Значение без пробелов и кавычек пишется как есть, остальные — строкой в кавычках"""
+    text = str(value)
+    if not text or any(char in text for char in ' ="\\\n\t'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class LogfmtFormatter(logging.Formatter):
+    """Formatter, который дописывает к сообщению поля extra= в виде key=value"""
+
+    def formatMessage(self, record):
+        message = super().formatMessage(record)
+        fields = [
+            f'{key}={format_value(value)}'
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_')
+        ]
+        return ' '.join([message, *fields])
@@ -0,0 +1,113 @@
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from core.benchmarks import BENCHMARKS, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеры производительности: Image.save по форматам и размерам, массовое удаление '
+        'через сигналы, User.save с генерацией username, списки админки. '
+        'Работает во временной тестовой базе (как manage.py test), результат — JSON. '
+        'Пример: manage.py benchmark --scale 100000 --repeat 3 --output after.json --compare before.json'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=1000,
+            help='Сколько строк заводить в таблицах перед замером (обычно 1000 или 100000)'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждой операции')
+        parser.add_argument(
+            '--only', action='append', choices=sorted(BENCHMARKS),
+            help='Запустить только этот замер (можно указать несколько раз)'
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию — stdout)')
+        parser.add_argument('--compare', help='JSON-отчёт прошлого запуска для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост медианы времени при сравнении (доля, по умолчанию 0.2)'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую базу после замеров')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1')
+        if connection.vendor != 'postgresql':
+            self.stderr.write(
+                f'Внимание: база {connection.vendor}, результаты несравнимы с замерами на PostgreSQL'
+            )
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        names = options['only'] or list(BENCHMARKS)
+        results = {}
+        media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+        # Как в manage.py test: DEBUG выключен, иначе Django копит все запросы в памяти
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                for name in names:
+                    self.stderr.write(f'{name} (scale={options["scale"]}, repeat={options["repeat"]})...')
+                    # Каждый замер начинает с пустых таблиц
+                    call_command('flush', interactive=False, verbosity=0)
+                    results.update(BENCHMARKS[name](options['scale'], options['repeat']))
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'commit': self.get_commit(),
+                'created_at': timezone.now().isoformat(),
+                'scale': options['scale'],
+                'repeat': options['repeat'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            lines, regressions = compare_results(baseline, report, options['threshold'])
+            for line in lines:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(f'Регрессии: {", ".join(regressions)}')
+
+    def get_commit(self):
+        """Текущий коммит git, если проект запущен из рабочей копии"""
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout.strip()
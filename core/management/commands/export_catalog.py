@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+from core.models import File, Image
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка изображений, файлов или пользователей в CSV/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=['image', 'file', 'user'])
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='Путь к файлу (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--active-only', action='store_true', help='Только активные записи')
+
+    def handle(self, *args, **options):
+        model = {
+            'image': Image,
+            'file': File,
+            'user': get_user_model(),
+        }[options['catalog']]
+
+        queryset = model.objects.order_by('pk')
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+
+        chunks = iter_export(queryset, options['format'], chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f'Выгрузка сохранена в {options["output"]}'))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
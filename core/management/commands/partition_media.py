@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.models import File, Image
+from core.partitioning import MediaPartitioner
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирование таблиц изображений и файлов по месяцам (PostgreSQL). '
+        'Без флагов создаёт недостающие будущие секции — удобно запускать из cron раз в месяц. '
+        '--convert однократно преобразует обычные таблицы в секционированные, '
+        '--archive переносит старые неактивные записи в архивные подсекции '
+        '(их можно исключить из ежедневных бэкапов: pg_dump --exclude-table-data="core_*_archive").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Преобразовать обычные таблицы в секционированные (блокирует таблицы на время копирования)'
+        )
+        parser.add_argument(
+            '--archive', action='store_true',
+            help='Перенести неактивные записи старых месяцев в архивные подсекции'
+        )
+        parser.add_argument('--months-ahead', type=int, default=settings.MEDIA_PARTITION_MONTHS_AHEAD)
+        parser.add_argument('--archive-after-days', type=int, default=settings.MEDIA_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--dry-run', action='store_true', help='Только показать SQL')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование поддерживается только для PostgreSQL')
+
+        log = (lambda sql: self.stdout.write(sql)) if options['dry_run'] else None
+        cutoff = datetime.now(dt_timezone.utc).date() - timedelta(days=options['archive_after_days'])
+
+        for model in (Image, File):
+            table = model._meta.db_table
+            partitioner = MediaPartitioner(connection, table, dry_run=options['dry_run'], log=log)
+
+            with transaction.atomic(using=options['database']):
+                if not partitioner.is_partitioned():
+                    if not options['convert']:
+                        self.stdout.write(f'{table}: таблица не секционирована (запустите с --convert)')
+                        continue
+                    partitioner.convert(options['months_ahead'])
+                    self.stdout.write(self.style.SUCCESS(f'{table}: преобразована в секционированную'))
+                    if options['dry_run']:
+                        continue
+
+                created = partitioner.ensure_future_partitions(options['months_ahead'])
+                for name in created:
+                    self.stdout.write(f'{table}: создана секция {name}')
+
+                if options['archive']:
+                    archived = partitioner.archive(cutoff, settings.MEDIA_ARCHIVE_TABLESPACE)
+                    for name in archived:
+                        self.stdout.write(f'{table}: секция {name} разделена на активную и архивную')
+
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import storage_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику хранилища (StorageUsage) по таблицам изображений и файлов. '
+        'Нужна после массовых изменений в обход save()/delete() (queryset.update, SQL).'
+    )
+
+    def handle(self, *args, **options):
+        rows = storage_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Статистика пересчитана: {rows} строк счётчиков'))
@@ -0,0 +1,283 @@
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from core import page_cache, storage_stats
+from core.models import Image
+from core.reencoding import SOURCE_TYPES, TARGET_FORMATS, init_worker, reencode_job
+from core.site_config import get_site_config
+from core.tasks import schedule_file_removal
+
+
+class Command(BaseCommand):
+    help = (
+        'Перекодирует существующие изображения (BMP, PNG, JPEG) в WebP или AVIF '
+        'пачками по возрастанию id в пуле процессов. Запись обновляется, только если '
+        'файл заметно уменьшился. Повторный запуск продолжает с необработанных записей. '
+        'Пример: manage.py reencode_images --format webp --quality 80 --dry-run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(TARGET_FORMATS), default='webp', help='Целевой формат')
+        parser.add_argument('--quality', type=int, default=80, help='Качество сжатия (1–100)')
+        parser.add_argument(
+            '--type', action='append', dest='types', choices=['BMP', 'PNG', 'JPEG', 'GIF', 'WEBP'],
+            help=f'Исходный тип файла (можно указать несколько раз). По умолчанию: {", ".join(SOURCE_TYPES)}'
+        )
+        parser.add_argument('--min-size', type=int, default=10 * 1024, help='Не трогать файлы меньше (байты)')
+        parser.add_argument(
+            '--min-saving', type=float, default=0.1,
+            help='Минимальная экономия, при которой файл заменяется (доля, по умолчанию 0.1)'
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='Записей в одной пачке')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Процессов кодирования')
+        parser.add_argument('--start-id', type=int, default=0, help='Начать с записей, чей id больше этого')
+        parser.add_argument(
+            '--keep-originals', action=argparse.BooleanOptionalAction, default=None,
+            help='Оставлять исходные файлы на диске (по умолчанию — IMAGE_REENCODE_KEEP_ORIGINALS)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Ничего не менять: оценить экономию по случайной выборке'
+        )
+        parser.add_argument('--sample', type=int, default=50, help='Размер выборки на каждый тип для --dry-run')
+
+    def handle(self, *args, **options):
+        try:
+            default_storage.path('')
+        except NotImplementedError:
+            raise CommandError('Хранилище не файловое — перекодирование работает только с файлами на диске')
+        if not 1 <= options['quality'] <= 100:
+            raise CommandError('--quality должен быть от 1 до 100')
+
+        self.target_format = options['format']
+        self.quality = options['quality']
+        self.min_saving = options['min_saving']
+        self.types = options['types'] or list(SOURCE_TYPES)
+        self.candidates = Image.objects.filter(
+            file_type__in=self.types,
+            file_size__gte=options['min_size'],
+            processing_status=Image.ProcessingStatus.READY,
+        )
+        keep_originals = options['keep_originals']
+        if keep_originals is None:
+            keep_originals = settings.IMAGE_REENCODE_KEEP_ORIGINALS
+
+        executor = ProcessPoolExecutor(
+            max_workers=options['workers'],
+            # Как в run_tasks: дочерние процессы не должны наследовать подключения к базе
+            mp_context=multiprocessing.get_context('spawn'),
+            # Лимиты core.imaging: в процессах пула Django не настроен
+            initializer=init_worker,
+            initargs=(
+                settings.IMAGE_DECODE_MEMORY_BUDGET_MB * 1024 * 1024,
+                get_site_config().max_image_pixels,
+                settings.IMAGE_DECODE_TIMEOUT,
+            ),
+        )
+        with executor:
+            if options['dry_run']:
+                self.estimate(executor, options['sample'])
+            else:
+                self.reencode_all(executor, options['start_id'], options['batch_size'], keep_originals)
+
+    def reencode_all(self, executor, start_id, batch_size, keep_originals):
+        """Обход записей по возрастанию id; после каждой пачки печатается id для продолжения"""
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        # {исходный тип: [файлов, байт до, байт после]}
+        report = defaultdict(lambda: [0, 0, 0])
+        skipped = failed = 0
+        last_id = start_id
+        while not self.stopping:
+            batch = list(self.candidates.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].pk
+
+            jobs = {}
+            reserved = set()
+            for image in batch:
+                target_name = self.target_name(image, reserved)
+                reserved.add(target_name)
+                jobs[image.pk] = (image, target_name)
+            futures = [
+                executor.submit(
+                    reencode_job, image.pk, image.image.path, default_storage.path(target_name),
+                    self.target_format, self.quality,
+                )
+                for image, target_name in jobs.values()
+            ]
+
+            try:
+                for future in as_completed(futures):
+                    image_id, new_size, error = future.result()
+                    image, target_name = jobs.pop(image_id)
+                    if error:
+                        failed += 1
+                        self.stderr.write(f'#{image_id} {image.image.name}: {error}')
+                        continue
+                    old_type, old_size = image.file_type, image.file_size
+                    if new_size > old_size * (1 - self.min_saving) or not self.replace(
+                        image, target_name, new_size, keep_originals
+                    ):
+                        default_storage.delete(target_name)
+                        skipped += 1
+                        continue
+                    counters = report[old_type]
+                    counters[0] += 1
+                    counters[1] += old_size
+                    counters[2] += new_size
+            finally:
+                # Прервались посреди пачки: новые файлы незавершённых заданий ни на что не ссылаются
+                if jobs:
+                    for future in futures:
+                        future.cancel()
+                    wait(futures)
+                    for _, target_name in jobs.values():
+                        default_storage.delete(target_name)
+
+            converted = sum(counters[0] for counters in report.values())
+            self.stdout.write(
+                f'До id {last_id}: перекодировано {converted}, пропущено {skipped}, ошибок {failed}'
+            )
+
+        if self.stopping:
+            self.stdout.write(self.style.WARNING(f'Остановлено. Продолжить: --start-id {last_id}'))
+        self.write_report(report, 'Итого')
+        self.stdout.write(
+            'Исходные файлы оставлены на диске' if keep_originals
+            else 'Исходные файлы удаляются фоновой задачей'
+        )
+
+    def target_name(self, image, reserved):
+        """Имя нового файла рядом с исходным: photo.png -> photo.webp"""
+        extension = TARGET_FORMATS[self.target_format][0]
+        stem = os.path.splitext(image.image.name)[0]
+        name = stem + extension
+        # photo.png и photo.bmp в одной директории не должны получить один и тот же photo.webp
+        if name in reserved or default_storage.exists(name):
+            name = default_storage.get_available_name(f'{stem}_{image.pk}{extension}')
+        return name
+
+    def replace(self, image, target_name, new_size, keep_originals):
+        """
+        Переключает запись на новый файл и переносит её в счётчиках StorageUsage.
+        False — если файл успели заменить или запись удалили.
+        """
+        old_name = image.image.name
+        with transaction.atomic():
+            image = Image.objects.select_for_update().filter(pk=image.pk, image=old_name).first()
+            if image is None:
+                return False
+            old_state = storage_stats.usage_state(image)
+            image.image.name = target_name
+            image.file_size = new_size
+            image.file_type = TARGET_FORMATS[self.target_format][1]
+            # update() минует save() и сигналы: заглушка и размеры в пикселях не меняются,
+            # повторная обработка не нужна. updated_at — для ETag API, кэш страниц сбрасываем сами
+            Image.objects.filter(pk=image.pk).update(
+                image=target_name, file_size=new_size, file_type=image.file_type, updated_at=timezone.now()
+            )
+            storage_stats.record_change(old_state, storage_stats.usage_state(image))
+            keys = page_cache.model_keys(image)
+            transaction.on_commit(lambda: page_cache.purge(*keys))
+            if not keep_originals:
+                schedule_file_removal(default_storage.path(old_name))
+        return True
+
+    def estimate(self, executor, sample_size):
+        """Оценка экономии: случайная выборка каждого типа кодируется во временную директорию"""
+        totals = {
+            row['file_type']: (row['count'], row['size'])
+            for row in self.candidates.order_by().values('file_type').annotate(
+                count=Count('pk'), size=Sum('file_size')
+            )
+        }
+        bounds = self.candidates.aggregate(first=Min('pk'), last=Max('pk'))
+        if not totals:
+            self.stdout.write('Нет изображений для перекодирования')
+            return
+
+        directory = tempfile.mkdtemp(prefix='reencode-sample-')
+        try:
+            report = defaultdict(lambda: [0, 0, 0])
+            for file_type in totals:
+                sample = self.sample(file_type, sample_size, bounds['first'], bounds['last'])
+                futures = {
+                    executor.submit(
+                        reencode_job, image.pk, image.image.path,
+                        os.path.join(directory, f'{image.pk}{TARGET_FORMATS[self.target_format][0]}'),
+                        self.target_format, self.quality,
+                    ): image
+                    for image in sample
+                }
+                for future in as_completed(futures):
+                    image = futures[future]
+                    _, new_size, error = future.result()
+                    counters = report[file_type]
+                    counters[0] += 1
+                    counters[1] += image.file_size
+                    # Файл, который не перекодировался или не уменьшился, останется как есть
+                    if error or new_size > image.file_size * (1 - self.min_saving):
+                        new_size = image.file_size
+                    counters[2] += new_size
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        estimated = {}
+        for file_type, (count, size) in totals.items():
+            sampled, before, after = report[file_type]
+            ratio = after / before if before else 1
+            estimated[file_type] = [count, size, round(size * ratio)]
+            self.stdout.write(f'{file_type}: выборка {sampled} из {count}, размер после — {ratio:.0%} исходного')
+        self.write_report(estimated, f'Оценка для {self.target_format.upper()} (качество {self.quality})')
+
+    def sample(self, file_type, size, first_id, last_id):
+        """
+        Случайные записи данного типа без ORDER BY random(): для случайного id
+        берётся ближайшая следующая запись по индексу первичного ключа.
+        """
+        rng = random.Random()
+        candidates = self.candidates.filter(file_type=file_type).order_by('pk')
+        sample = {}
+        for _ in range(size * 2):
+            if len(sample) >= size:
+                break
+            image = candidates.filter(pk__gte=rng.randint(first_id, last_id)).first()
+            if image is not None:
+                sample[image.pk] = image
+        return list(sample.values())
+
+    def write_report(self, report, title):
+        self.stdout.write(f'\n{title}:')
+        total_before = total_after = 0
+        for file_type, (count, before, after) in sorted(report.items()):
+            total_before += before
+            total_after += after
+            saved = before - after
+            self.stdout.write(
+                f'  {file_type:5} {count:>8} файлов  {filesizeformat(before):>10} → {filesizeformat(after):>10}  '
+                f'экономия {filesizeformat(saved)} ({saved / before if before else 0:.0%})'
+            )
+        saved = total_before - total_after
+        self.stdout.write(self.style.SUCCESS(f'  Всего сэкономлено: {filesizeformat(saved)}'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,99 @@
+import multiprocessing
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.tasks import DEFAULT_TASK_BACKEND_ALIAS, task_backends
+from django.utils.crypto import get_random_string
+
+from core.task_backend import DatabaseBackend
+from core.task_runner import init_process, run_task
+
+
+class Command(BaseCommand):
+    help = (
+        'Обработчик фоновых задач (core.task_backend.DatabaseBackend). '
+        'Выполняет задачи параллельно в пуле потоков или процессов, '
+        'по приоритету, с повторами при ошибках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default=DEFAULT_TASK_BACKEND_ALIAS)
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Очередь для обработки (можно указать несколько раз). По умолчанию все очереди бэкенда'
+        )
+        parser.add_argument('--concurrency', type=int, default=4, help='Сколько задач выполнять одновременно')
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='thread — для задач с вводом-выводом, process — для тяжёлых вычислений (Pillow)'
+        )
+        parser.add_argument('--interval', type=float, default=1.0, help='Пауза опроса пустой очереди (секунды)')
+        parser.add_argument('--once', action='store_true', help='Выполнить доступные задачи и выйти')
+
+    def handle(self, *args, **options):
+        backend = task_backends[options['backend']]
+        if not isinstance(backend, DatabaseBackend):
+            raise CommandError(f'Бэкенд {options["backend"]} не хранит задачи в базе')
+
+        queues = options['queues'] or sorted(backend.queues)
+        concurrency = options['concurrency']
+        worker_id = f'{socket.gethostname()}-{get_random_string(8)}'
+
+        if options['pool'] == 'process':
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency,
+                # spawn, а не fork: дочерние процессы не должны делить
+                # с родителем открытые подключения к базе
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_process,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write(
+            f'Обработчик {worker_id}: очереди {", ".join(queues)}, '
+            f'{concurrency} × {options["pool"]}'
+        )
+
+        running = set()
+        try:
+            while not self.stopping:
+                free = concurrency - len(running)
+                task_ids = backend.claim(worker_id, queues, free) if free else []
+                close_old_connections()
+                for task_id in task_ids:
+                    running.add(executor.submit(run_task, backend.alias, task_id))
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                # Пул занят — ждём освобождения места, иначе — следующего опроса
+                pool_is_full = len(running) >= concurrency
+                done, running = wait(
+                    running,
+                    timeout=None if pool_is_full else options['interval'],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Ошибки самих задач сохраняются в очереди; сюда попадают сбои обработчика
+                        self.stderr.write(f'Ошибка обработчика: {e!r}')
+        finally:
+            self.stdout.write('Ожидаем завершения выполняющихся задач...')
+            executor.shutdown(wait=True)
+
+    def stop(self, signum, frame):
+        self.stopping = True
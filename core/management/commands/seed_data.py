@@ -0,0 +1,104 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from core import page_cache, seeding, storage_stats
+from core.models import File, Image
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими изображениями, документами и пользователями '
+        'для нагрузочного тестирования (PostgreSQL, загрузка через COPY). '
+        'Одинаковый --seed даёт одинаковые данные. '
+        'Пример: manage.py seed_data --images 1000000 --files 1000000 --users 100000'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=0, help='Сколько изображений создать')
+        parser.add_argument('--files', type=int, default=0, help='Сколько документов создать')
+        parser.add_argument('--users', type=int, default=0, help='Сколько пользователей создать')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора случайных чисел')
+        parser.add_argument(
+            '--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4),
+            help='Потоков записи файлов на диск'
+        )
+        parser.add_argument('--batch-size', type=int, default=seeding.COPY_BATCH_SIZE, help='Строк в одном COPY')
+        parser.add_argument('--no-files', action='store_true', help='Только строки в базе, без файлов на диске')
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль всех созданных пользователей (по умолчанию вход по паролю невозможен)'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_data загружает данные через COPY и работает только с PostgreSQL')
+        if not options['no_files']:
+            try:
+                default_storage.path('')
+            except NotImplementedError:
+                raise CommandError('Хранилище не файловое — запустите с --no-files')
+
+        rng = random.Random(options['seed'])
+        self.connection = connection
+        self.using = options['database']
+        self.batch_size = options['batch_size']
+        self.write_files = not options['no_files']
+
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='seed-writer') as executor:
+            self.executor = executor
+            if options['images']:
+                templates = seeding.image_templates(rng)
+                self.load(Image, options['images'], lambda count, first: seeding.generate_images(
+                    rng, templates, count, first
+                ))
+            if options['files']:
+                templates = seeding.document_templates(rng)
+                self.load(File, options['files'], lambda count, first: seeding.generate_files(
+                    rng, templates, count, first
+                ))
+
+        if options['users']:
+            # Хеш пароля считается один раз: make_password на каждую строку занял бы часы
+            password = make_password(options['password'])
+            self.load(get_user_model(), options['users'], lambda count, first: (
+                seeding.generate_users(rng, count, first, password), []
+            ))
+
+        if options['images'] or options['files']:
+            self.stdout.write('Пересчёт статистики хранилища...')
+            storage_stats.rebuild()
+            # COPY минует сигналы — закэшированные списки сбрасываем сами
+            page_cache.purge('image-list', 'file-list')
+
+    def load(self, model, total, generate):
+        """Генерирует и загружает строки пачками; файлы пачки пишутся, пока идёт COPY"""
+        label = model._meta.verbose_name_plural
+        # Номера в именах файлов и логинах продолжают существующие id — повторный запуск не конфликтует
+        first_number = (model.objects.using(self.using).aggregate(last=Max('pk'))['last'] or 0) + 1
+        started_at = time.monotonic()
+        done = 0
+        while done < total:
+            count = min(self.batch_size, total - done)
+            rows, files = generate(count, first_number + done)
+
+            pending = seeding.write_files(self.executor, default_storage, files) if self.write_files else []
+            with transaction.atomic(using=self.using):
+                seeding.copy_rows(self.connection, model, rows)
+            for future in wait(pending).done:
+                future.result()
+
+            done += count
+            elapsed = time.monotonic() - started_at
+            self.stdout.write(f'{label}: {done}/{total} ({done / elapsed:.0f} строк/с)')
+        self.stdout.write(self.style.SUCCESS(f'{label}: загружено {total} за {time.monotonic() - started_at:.1f} с'))
@@ -0,0 +1,143 @@
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Выполняется в отдельном «холодном» процессе с -X importtime.
+# Замеряет загрузку настроек и каждую фазу django.setup() по приложениям,
+# результат печатает в stdout одной строкой JSON (importtime пишет в stderr).
+PROFILE_SCRIPT = '''
+import json
+import time
+
+started_at = time.perf_counter()
+
+import django
+from django.apps.config import AppConfig
+from django.conf import settings
+
+timings = {'apps': {}}
+
+
+def timed(phase, label, func):
+    phase_started_at = time.perf_counter()
+    result = func()
+    timings['apps'].setdefault(label, {})[phase] = time.perf_counter() - phase_started_at
+    return result
+
+
+original_create = AppConfig.create.__func__
+original_import_models = AppConfig.import_models
+
+
+def create(cls, entry):
+    app_config = timed('import', entry, lambda: original_create(cls, entry))
+    ready = app_config.ready
+    app_config.ready = lambda: timed('ready', entry, ready)
+    return app_config
+
+
+def import_models(self):
+    return timed('models', self.name, lambda: original_import_models(self))
+
+
+AppConfig.create = classmethod(create)
+AppConfig.import_models = import_models
+
+settings_started_at = time.perf_counter()
+settings.INSTALLED_APPS
+timings['settings'] = time.perf_counter() - settings_started_at
+
+setup_started_at = time.perf_counter()
+django.setup()
+timings['setup'] = time.perf_counter() - setup_started_at
+
+urls_started_at = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+timings['urls'] = time.perf_counter() - urls_started_at
+
+timings['total'] = time.perf_counter() - started_at
+print(json.dumps(timings))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Профиль холодного старта процесса: время загрузки настроек, django.setup() '
+        'по приложениям (импорт, модели, ready), загрузки URL и самые тяжёлые импорты '
+        '(по данным python -X importtime). Запускается в отдельном процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Сколько самых тяжёлых модулей показать')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT],
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Процесс профилирования завершился с ошибкой:\n{result.stderr[-5000:]}')
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        modules, packages = self.parse_importtime(result.stderr)
+        top = sorted(modules, key=lambda module: module['cumulative'], reverse=True)[:options['top']]
+        by_package = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'timings': timings,
+                'modules': top,
+                'packages': dict(by_package),
+            }, indent=2))
+            return
+
+        ms = lambda seconds: f'{seconds * 1000:8.1f} мс'
+        self.stdout.write(f'Всего до готовности URL: {ms(timings["total"])}')
+        self.stdout.write(f'  настройки:             {ms(timings["settings"])}')
+        self.stdout.write(f'  django.setup():        {ms(timings["setup"])}')
+        self.stdout.write(f'  загрузка URLconf:      {ms(timings["urls"])}')
+
+        self.stdout.write('\nПриложения (импорт / модели / ready):')
+        for label, phases in timings['apps'].items():
+            self.stdout.write(
+                f'  {label:40} {ms(phases.get("import", 0))} {ms(phases.get("models", 0))} '
+                f'{ms(phases.get("ready", 0))}'
+            )
+
+        self.stdout.write(f'\nСамые тяжёлые импорты (суммарно, вместе с зависимостями), топ {options["top"]}:')
+        for module in top:
+            self.stdout.write(
+                f'  {ms(module["cumulative"] / 1e6)}  (собственное {ms(module["self"] / 1e6).strip()})  '
+                f'{"  " * module["depth"]}{module["name"]}'
+            )
+
+        self.stdout.write('\nСобственное время импорта по пакетам верхнего уровня:')
+        for package, microseconds in by_package:
+            self.stdout.write(f'  {ms(microseconds / 1e6)}  {package}')
+
+    def parse_importtime(self, output):
+        """Строки -X importtime: список модулей и собственное время по пакетам (мкс)"""
+        modules = []
+        packages = defaultdict(int)
+        for line in output.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'name': name,
+                'self': int(self_us),
+                'cumulative': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2,
+            })
+            packages[name.split('.')[0]] += int(self_us)
+        return modules, packages
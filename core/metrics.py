@@ -0,0 +1,130 @@
+"""
+Метрики Prometheus для горячих путей: загрузка, сохранение, обработка
+и удаление медиа, обработчики сигналов, HTTP-запросы (в том числе админка).
+
+Отдаются представлением metrics_view (/metrics):
+- если задан METRICS_TOKEN — только с заголовком Authorization: Bearer <токен>;
+- иначе только напрямую с адресов из METRICS_ALLOWED_IPS. За обратным
+  прокси все запросы приходят с 127.0.0.1, поэтому запросы с заголовками
+  прокси (X-Forwarded-For, Forwarded, X-Real-IP) отклоняются — за прокси
+  задайте токен или не пробрасывайте /metrics наружу.
+
+Под gunicorn с несколькими воркерами задайте переменную окружения
+PROMETHEUS_MULTIPROC_DIR (пустой каталог, очищаемый при старте) —
+каждый процесс пишет свои значения в файлы, а /metrics суммирует их.
+В конфиге gunicorn нужен хук для завершившихся воркеров:
+
+    from prometheus_client import multiprocess
+
+    def child_exit(server, worker):
+        multiprocess.mark_process_dead(worker.pid)
+"""
+import hmac
+import ipaddress
+import os
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess,
+)
+
+
+# Границы корзин для быстрых операций (сигналы, сохранение) и для долгих (загрузка, обработка)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+MEDIA_SAVE_SECONDS = Histogram(
+    'cms_media_save_seconds', 'Время Image.save / File.save (вместе с сигналами)',
+    ['model'], buckets=FAST_BUCKETS,
+)
+IMAGE_PROCESSING_SECONDS = Histogram(
+    'cms_image_processing_seconds', 'Время разбора изображения Pillow в фоновой задаче',
+    ['outcome'], buckets=SLOW_BUCKETS,
+)
+SIGNAL_HANDLER_SECONDS = Histogram(
+    'cms_signal_handler_seconds', 'Время обработчиков сигналов моделей',
+    ['handler'], buckets=FAST_BUCKETS,
+)
+UPLOAD_SECONDS = Histogram(
+    'cms_upload_seconds', 'Время приёма загружаемого файла',
+    buckets=SLOW_BUCKETS,
+)
+UPLOAD_BYTES = Counter(
+    'cms_upload_bytes', 'Принято байт в загрузках',
+)
+FILES_SCHEDULED_FOR_REMOVAL = Counter(
+    'cms_files_scheduled_for_removal', 'Файлов поставлено в очередь на удаление сигналами',
+)
+FILES_REMOVED = Counter(
+    'cms_files_removed', 'Файлов удалено с диска фоновой задачей',
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'cms_http_request_seconds', 'Время обработки HTTP-запроса',
+    ['view', 'method', 'status'], buckets=SLOW_BUCKETS,
+)
+
+
+def timed_receiver(func):
+    """Декоратор обработчика сигнала: время выполнения в SIGNAL_HANDLER_SECONDS"""
+    histogram = SIGNAL_HANDLER_SECONDS.labels(handler=func.__name__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with histogram.time():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class MetricsUploadHandler(FileUploadHandler):
+    """
+    Считает байты и время приёма загружаемых файлов.
+    Данные не забирает — ставится первым в FILE_UPLOAD_HANDLERS,
+    файл сохраняют следующие обработчики.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.started_at = time.perf_counter()
+
+    def receive_data_chunk(self, raw_data, start):
+        UPLOAD_BYTES.inc(len(raw_data))
+        return raw_data
+
+    def file_complete(self, file_size):
+        UPLOAD_SECONDS.observe(time.perf_counter() - self.started_at)
+        return None
+
+
+# Заголовки, которые добавляет обратный прокси: REMOTE_ADDR тогда — адрес прокси
+PROXY_HEADERS = ('HTTP_X_FORWARDED_FOR', 'HTTP_FORWARDED', 'HTTP_X_REAL_IP')
+
+
+def _is_allowed(request):
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())
+    if any(header in request.META for header in PROXY_HEADERS):
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus (по токену или только для локальных адресов)"""
+    if not _is_allowed(request):
+        return HttpResponseForbidden()
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,156 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import HTTP_REQUEST_SECONDS
+from .query_stats import collect_queries
+from .routers import is_pinned_to_primary, pin_to_primary
+
+
+logger = logging.getLogger('core.query_stats')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Закрепляет запрос за основной базой, если пользователь недавно что-то записал.
+
+    Изменяющие запросы (POST, PUT, ...) всегда читают с основной базы.
+    Если во время запроса была запись, ставим короткоживущую cookie —
+    следующие запросы (например, редирект после сохранения в админке)
+    тоже читают с основной базы, пока реплики догоняют изменения.
+    """
+    sync_capable = True
+    async_capable = True
+
+    cookie_name = 'db_pin'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned_by_cookie = self.process_request(request)
+        response = self.get_response(request)
+        return self.process_response(request, response, pinned_by_cookie)
+
+    async def __acall__(self, request):
+        pinned_by_cookie = self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response, pinned_by_cookie)
+
+    def process_request(self, request):
+        # Сбрасываем флаг явно: потоки WSGI-сервера переиспользуются между запросами
+        pinned_by_cookie = self.cookie_name in request.COOKIES
+        pin_to_primary(pinned_by_cookie or request.method not in self.safe_methods)
+        return pinned_by_cookie
+
+    def process_response(self, request, response, pinned_by_cookie):
+        if settings.DATABASE_REPLICAS and is_pinned_to_primary() and not pinned_by_cookie:
+            response.set_cookie(
+                self.cookie_name,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class QueryStatsMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса (core.query_stats).
+
+    С QUERY_STATS_HEADERS (по умолчанию в DEBUG) добавляет заголовки
+    X-DB-Queries и Server-Timing — их видно во вкладке Network браузера.
+    Строку в лог пишет в DEBUG для каждого запроса, иначе — для доли
+    QUERY_STATS_SAMPLE_RATE запросов. Повторяющиеся запросы (N+1) — WARNING.
+
+    Ставится первым в MIDDLEWARE, чтобы учесть и запросы других middleware.
+    Запросы потоковых ответов, выполняемые при отдаче тела, не учитываются.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_queries() as collector:
+            response = self.get_response(request)
+        return self.process_response(request, response, collector)
+
+    async def __acall__(self, request):
+        with collect_queries() as collector:
+            response = await self.get_response(request)
+        return self.process_response(request, response, collector)
+
+    def process_response(self, request, response, collector):
+        duration_ms = collector.duration * 1000
+        repeated = collector.repeated()
+
+        if settings.QUERY_STATS_HEADERS:
+            response['X-DB-Queries'] = str(collector.count)
+            response['Server-Timing'] = f'db;dur={duration_ms:.1f};desc="{collector.count} queries"'
+            if repeated:
+                response['X-DB-Repeated-Queries'] = str(sum(count for _, count in repeated))
+
+        if settings.DEBUG or random.random() < settings.QUERY_STATS_SAMPLE_RATE:
+            if repeated:
+                logger.warning(
+                    '%s %s: %d запросов, %.1f мс; повторяются (возможен N+1): %s',
+                    request.method, request.path, collector.count, duration_ms,
+                    '; '.join(f'{count}× {sql[:200]}' for sql, count in repeated),
+                )
+            else:
+                logger.info(
+                    '%s %s: %d запросов, %.1f мс',
+                    request.method, request.path, collector.count, duration_ms,
+                )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Время обработки HTTP-запросов в метрике cms_http_request_seconds
+    с разбивкой по имени представления (например, admin:core_image_changelist).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started_at = time.perf_counter()
+        response = self.get_response(request)
+        return self.process_response(request, response, started_at)
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        response = await self.get_response(request)
+        return self.process_response(request, response, started_at)
+
+    def process_response(self, request, response, started_at):
+        # Имя маршрута, а не путь: число меток не растёт с количеством записей
+        match = request.resolver_match
+        HTTP_REQUEST_SECONDS.labels(
+            view=match.view_name if match else 'unresolved',
+            method=request.method,
+            status=response.status_code,
+        ).observe(time.perf_counter() - started_at)
+        return response
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+def populate_storage_usage(apps, schema_editor):
+    """Счётчики для уже загруженных записей — тем же подсчётом, что и rebuild_storage_stats"""
+    from core.storage_stats import count_usage
+
+    StorageUsage = apps.get_model('core', 'StorageUsage')
+    rows = count_usage(StorageUsage, {apps.get_model('core', 'Image'): 'image', apps.get_model('core', 'File'): 'file'})
+    StorageUsage.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('image', 'Изображения'), ('file', 'Файлы')], max_length=10, verbose_name='Модель')),
+                ('file_type', models.CharField(blank=True, max_length=50, verbose_name='Тип файла')),
+                ('month', models.DateField(verbose_name='Месяц загрузки')),
+                ('is_active', models.BooleanField(verbose_name='Активен')),
+                ('files_count', models.BigIntegerField(default=0, verbose_name='Количество файлов')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='Объём (байты)')),
+            ],
+            options={
+                'verbose_name': 'Статистика хранилища',
+                'verbose_name_plural': 'Статистика хранилища',
+                'ordering': ['-month', 'model_name', 'file_type'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['-file_size'], name='core_file_file_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['-file_size'], name='core_image_file_size_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='storageusage',
+            constraint=models.UniqueConstraint(fields=('model_name', 'file_type', 'month', 'is_active'), name='core_storageusage_unique_key'),
+        ),
+        migrations.RunPython(populate_storage_usage, migrations.RunPython.noop),
+    ]
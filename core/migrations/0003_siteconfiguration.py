@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storageusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteConfiguration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_name', models.CharField(default='Корпоративный сайт', max_length=200, verbose_name='Название сайта')),
+                ('contact_email', models.EmailField(blank=True, max_length=254, verbose_name='Контактный email')),
+                ('contact_phone', models.CharField(blank=True, max_length=20, verbose_name='Контактный телефон')),
+                ('address', models.CharField(blank=True, max_length=255, verbose_name='Адрес')),
+                ('max_image_size_mb', models.PositiveIntegerField(default=10, verbose_name='Максимальный размер изображения (МБ)')),
+                ('max_image_pixels', models.PositiveIntegerField(default=40000000, verbose_name='Максимальное разрешение изображения (пикселей)')),
+                ('max_file_size_mb', models.PositiveIntegerField(default=50, verbose_name='Максимальный размер документа (МБ)')),
+            ],
+            options={
+                'verbose_name': 'Настройки сайта',
+                'verbose_name_plural': 'Настройки сайта',
+            },
+        ),
+    ]
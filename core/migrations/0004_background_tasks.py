@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_siteconfiguration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'В обработке'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='ready', editable=False, max_length=10, verbose_name='Статус обработки'),
+        ),
+        migrations.CreateModel(
+            name='QueuedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_path', models.CharField(max_length=255, verbose_name='Задача')),
+                ('backend', models.CharField(default='default', max_length=100, verbose_name='Бэкенд')),
+                ('queue_name', models.CharField(default='default', max_length=100, verbose_name='Очередь')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('args', models.JSONField(default=list, verbose_name='Аргументы')),
+                ('kwargs', models.JSONField(default=dict, verbose_name='Именованные аргументы')),
+                ('status', models.CharField(choices=[('READY', 'Ожидает'), ('RUNNING', 'Выполняется'), ('FAILED', 'Ошибка'), ('SUCCESSFUL', 'Выполнена')], default='READY', max_length=10, verbose_name='Статус')),
+                ('run_after', models.DateTimeField(blank=True, null=True, verbose_name='Не раньше')),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('last_attempted_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя попытка')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('return_value', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('errors', models.JSONField(default=list, verbose_name='Ошибки')),
+                ('worker_ids', models.JSONField(default=list, verbose_name='Обработчики')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-enqueued_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'READY')), fields=['queue_name', '-priority', 'enqueued_at'], name='core_queuedtask_ready_idx')],
+            },
+        ),
+    ]
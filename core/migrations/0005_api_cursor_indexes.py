@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_background_tasks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['-created_at', '-id'], name='core_file_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['-created_at', '-id'], name='core_image_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_api_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='dominant_color',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Доминирующий цвет'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='placeholder',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Заглушка (BlurHash)'),
+        ),
+    ]
@@ -1,23 +1,47 @@
 import os
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from PIL import Image as PilImage
+from solo.models import SingletonModel
+
+from .imaging import read_size
+from .metrics import MEDIA_SAVE_SECONDS
 
 
 def validate_image_file(value):
     """Валидатор для изображений"""
     ext = os.path.splitext(value.name)[1].lower()
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg']
+    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.avif', '.svg']
     if ext not in valid_extensions:
         raise ValidationError(f'Неподдерживаемый формат изображения. Разрешены: {", ".join(valid_extensions)}')
     
     # Проверка MIME-типа (базовая)
-    valid_mimes = ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp', 'image/svg+xml']
+    valid_mimes = ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp', 'image/avif', 'image/svg+xml']
     if hasattr(value.file, 'content_type'):
         if value.file.content_type not in valid_mimes:
             raise ValidationError(f'Неподдерживаемый MIME-тип изображения')
 
+    # Лимиты проверяем только для новых загрузок, а не для уже сохранённых файлов
+    if getattr(value, '_committed', True):
+        return
+
+    from .site_config import get_site_config
+    config = get_site_config()
+    if value.size > config.max_image_size_mb * 1024 * 1024:
+        raise ValidationError(f'Изображение больше {config.max_image_size_mb} МБ')
+
+    if ext != '.svg':
+        # Размеры читаются из заголовка файла, без декодирования пикселей
+        try:
+            width, height = read_size(value)
+        except Exception:
+            raise ValidationError('Не удалось прочитать изображение')
+        if width * height > config.max_image_pixels:
+            raise ValidationError(
+                f'Слишком большое разрешение изображения ({width} × {height}). '
+                f'Максимум — {config.max_image_pixels} пикселей'
+            )
+
 
 def validate_document_file(value):
     """Валидатор для документов"""
@@ -29,6 +53,14 @@ def validate_document_file(value):
     if ext not in valid_extensions:
         raise ValidationError(f'Неподдерживаемый формат файла. Разрешены: {", ".join(valid_extensions)}')
 
+    if getattr(value, '_committed', True):
+        return
+
+    from .site_config import get_site_config
+    config = get_site_config()
+    if value.size > config.max_file_size_mb * 1024 * 1024:
+        raise ValidationError(f'Файл больше {config.max_file_size_mb} МБ')
+
 
 class StatusModel(models.Model):
     """
@@ -68,7 +100,29 @@ class SortableModel(models.Model):
         ordering = ['order']
 
 
-class Image(StatusModel):
+class ProcessingModel(models.Model):
+    """
+    Абстрактная базовая модель для сущностей,
+    которые дообрабатываются фоновыми задачами после сохранения.
+    """
+    class ProcessingStatus(models.TextChoices):
+        PENDING = 'pending', 'В обработке'
+        READY = 'ready', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    processing_status = models.CharField(
+        max_length=10,
+        choices=ProcessingStatus.choices,
+        default=ProcessingStatus.READY,
+        editable=False,
+        verbose_name='Статус обработки'
+    )
+
+    class Meta:
+        abstract = True
+
+
+class Image(StatusModel, ProcessingModel):
     """
     Централизованное хранение всех изображений сайта.
     """
@@ -99,6 +153,18 @@ class Image(StatusModel):
         blank=True,
         verbose_name='Высота (пиксели)'
     )
+    placeholder = models.CharField(
+        max_length=100,
+        editable=False,
+        blank=True,
+        verbose_name='Заглушка (BlurHash)'
+    )
+    dominant_color = models.CharField(
+        max_length=7,
+        editable=False,
+        blank=True,
+        verbose_name='Доминирующий цвет'
+    )
     file_size = models.PositiveIntegerField(
         editable=False,
         null=True,
@@ -116,6 +182,12 @@ class Image(StatusModel):
         verbose_name = 'Изображение'
         verbose_name_plural = 'Изображения'
         ordering = ['-created_at']
+        indexes = [
+            # Для списка самых больших файлов на странице статистики
+            models.Index(fields=['-file_size'], name='core_image_file_size_idx'),
+            # Курсорная пагинация API по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='core_image_created_idx'),
+        ]
 
     def __str__(self):
         if self.title:
@@ -125,7 +197,13 @@ class Image(StatusModel):
         return f'Изображение #{self.id}'
 
     def save(self, *args, **kwargs):
-        """При сохранении обновляем метаданные файла"""
+        """
+        При сохранении обновляем метаданные файла.
+        Дешёвые поля (размер, тип) заполняются сразу, а разбор изображения
+        через Pillow уходит в фоновую задачу core.tasks.process_image —
+        загрузка не ждёт декодирования.
+        """
+        needs_processing = False
         # Обновляем размер файла
         if self.image:
             self.file_size = self.image.size
@@ -135,26 +213,33 @@ class Image(StatusModel):
             type_map = {
                 '.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG',
                 '.gif': 'GIF', '.bmp': 'BMP', '.webp': 'WEBP',
-                '.svg': 'SVG'
+                '.avif': 'AVIF', '.svg': 'SVG'
             }
             self.file_type = type_map.get(ext, ext.upper().replace('.', ''))
-            
-            # Обновляем размеры изображения (если это не SVG)
-            if ext != '.svg':
-                try:
-                    # Открываем файл через PIL для получения размеров
-                    img = PilImage.open(self.image)
-                    self.width, self.height = img.size
-                except Exception as e:
-                    # Если не удалось определить размеры, оставляем null
-                    self.width = None
-                    self.height = None
-            else:
-                # Для SVG размеры не определяем
+
+            # Новый файл ещё не записан в хранилище (_committed=False)
+            if not self.image._committed:
                 self.width = None
                 self.height = None
-                
-        super().save(*args, **kwargs)
+                self.placeholder = ''
+                self.dominant_color = ''
+                if ext != '.svg':
+                    self.processing_status = self.ProcessingStatus.PENDING
+                    needs_processing = True
+                else:
+                    # Для SVG размеры не определяем
+                    self.processing_status = self.ProcessingStatus.READY
+
+        # Сохранение и обновление счётчиков StorageUsage (в сигналах) — одна транзакция
+        with MEDIA_SAVE_SECONDS.labels(model='image').time(), transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if needs_processing:
+                from .tasks import process_image
+                image_id, image_name = self.pk, self.image.name
+                transaction.on_commit(
+                    lambda: process_image.enqueue(image_id, image_name),
+                    using=kwargs.get('using')
+                )
 
 
 class File(StatusModel):
@@ -191,6 +276,10 @@ class File(StatusModel):
         verbose_name = 'Файл'
         verbose_name_plural = 'Файлы'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-file_size'], name='core_file_file_size_idx'),
+            models.Index(fields=['-created_at', '-id'], name='core_file_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -212,5 +301,208 @@ class File(StatusModel):
                 '.odt': 'ODT'
             }
             self.file_type = type_map.get(ext, ext.upper().replace('.', ''))
-            
-        super().save(*args, **kwargs)
\ No newline at end of file
+
+        with MEDIA_SAVE_SECONDS.labels(model='file').time(), transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class StorageUsage(models.Model):
+    """
+    Счётчики занятого места: количество файлов и байт на модель,
+    тип файла, месяц загрузки и статус активности.
+    Обновляются сигналами при сохранении и удалении Image/File,
+    полностью пересчитываются командой rebuild_storage_stats.
+    """
+    class ModelName(models.TextChoices):
+        IMAGE = 'image', 'Изображения'
+        FILE = 'file', 'Файлы'
+
+    model_name = models.CharField(
+        max_length=10,
+        choices=ModelName.choices,
+        verbose_name='Модель'
+    )
+    file_type = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Тип файла'
+    )
+    month = models.DateField(
+        verbose_name='Месяц загрузки'
+    )
+    is_active = models.BooleanField(
+        verbose_name='Активен'
+    )
+    # Не Positive*: если таблицы медиа меняли в обход моделей (сырым SQL),
+    # счётчики до rebuild_storage_stats могут уйти в минус
+    files_count = models.BigIntegerField(
+        default=0,
+        verbose_name='Количество файлов'
+    )
+    total_bytes = models.BigIntegerField(
+        default=0,
+        verbose_name='Объём (байты)'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика хранилища'
+        verbose_name_plural = 'Статистика хранилища'
+        ordering = ['-month', 'model_name', 'file_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_name', 'file_type', 'month', 'is_active'],
+                name='core_storageusage_unique_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_model_name_display()} {self.file_type} {self.month:%m.%Y}'
+
+
+class SiteConfiguration(SingletonModel):
+    """
+    Настройки сайта (единственная запись).
+    Читать через core.site_config.get_site_config() — он кэширует объект
+    и не делает запросов к базе на горячем пути.
+    """
+    site_name = models.CharField(
+        max_length=200,
+        default='Корпоративный сайт',
+        verbose_name='Название сайта'
+    )
+    contact_email = models.EmailField(
+        blank=True,
+        verbose_name='Контактный email'
+    )
+    contact_phone = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Контактный телефон'
+    )
+    address = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Адрес'
+    )
+    max_image_size_mb = models.PositiveIntegerField(
+        default=10,
+        verbose_name='Максимальный размер изображения (МБ)'
+    )
+    max_image_pixels = models.PositiveIntegerField(
+        default=40_000_000,
+        verbose_name='Максимальное разрешение изображения (пикселей)'
+    )
+    max_file_size_mb = models.PositiveIntegerField(
+        default=50,
+        verbose_name='Максимальный размер документа (МБ)'
+    )
+
+    class Meta:
+        verbose_name = 'Настройки сайта'
+        verbose_name_plural = 'Настройки сайта'
+
+    def __str__(self):
+        return 'Настройки сайта'
+
+
+class QueuedTask(models.Model):
+    """
+    Фоновая задача в очереди (хранилище core.task_backend.DatabaseBackend).
+    Выполняется командой manage.py run_tasks.
+    """
+    class Status(models.TextChoices):
+        # Те же значения, что и у django.tasks.TaskResultStatus
+        READY = 'READY', 'Ожидает'
+        RUNNING = 'RUNNING', 'Выполняется'
+        FAILED = 'FAILED', 'Ошибка'
+        SUCCESSFUL = 'SUCCESSFUL', 'Выполнена'
+
+    task_path = models.CharField(
+        max_length=255,
+        verbose_name='Задача'
+    )
+    backend = models.CharField(
+        max_length=100,
+        default='default',
+        verbose_name='Бэкенд'
+    )
+    queue_name = models.CharField(
+        max_length=100,
+        default='default',
+        verbose_name='Очередь'
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет'
+    )
+    args = models.JSONField(
+        default=list,
+        verbose_name='Аргументы'
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='Именованные аргументы'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.READY,
+        verbose_name='Статус'
+    )
+    run_after = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Не раньше'
+    )
+    enqueued_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлена'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начата'
+    )
+    last_attempted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя попытка'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+    return_value = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат'
+    )
+    errors = models.JSONField(
+        default=list,
+        verbose_name='Ошибки'
+    )
+    worker_ids = models.JSONField(
+        default=list,
+        verbose_name='Обработчики'
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-enqueued_at']
+        indexes = [
+            # Выборка следующих задач обработчиком: только ожидающие
+            models.Index(
+                fields=['queue_name', '-priority', 'enqueued_at'],
+                condition=models.Q(status='READY'),
+                name='core_queuedtask_ready_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task_path} #{self.pk}'
+
+    @property
+    def attempts(self):
+        return len(self.worker_ids)
@@ -0,0 +1,102 @@
+"""
+Кэш страниц и фрагментов с суррогатными ключами.
+
+Каждая закэшированная запись помечается ключами того, из чего она собрана:
+карточка изображения — image:42, список — image-list. У каждого ключа в общем
+кэше есть версия; запись хранится под именем, в которое входят текущие
+версии всех её ключей. purge('image:42') меняет версию — все записи с этим
+ключом перестают находиться, и ничего не нужно перебирать и удалять.
+Старые записи просто истекают по таймауту.
+
+Два уровня:
+1. Локальный кэш процесса (PAGE_CACHE_LOCAL) — сами записи, без сети и диска.
+2. Общий кэш (PAGE_CACHE_SHARED) — записи и версии ключей.
+
+Версии ключей читаются из общего кэша при каждом обращении (одно get_many),
+поэтому изменения, сброшенные в одном процессе, сразу видны во всех.
+Ключи записей моделей сбрасываются сигналами (core.signals) после коммита.
+
+Запись под новой версией живёт до PAGE_CACHE_TIMEOUT, поэтому она должна
+быть собрана из свежих данных:
+- версия меняется только после коммита — иначе другой процесс успеет
+  прочитать старые строки и сохранить их под новой версией;
+- заполняющий кэш запрос читает с основной базы (routers.use_primary):
+  реплика может ещё отставать от только что закоммиченной записи.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import use_primary
+
+
+def _shared():
+    return caches[settings.PAGE_CACHE_SHARED]
+
+
+def _local():
+    return caches[settings.PAGE_CACHE_LOCAL]
+
+
+def _version_key(key):
+    return f'surrogate:{key}'
+
+
+def model_keys(instance):
+    """Ключи записи модели: сама запись и списки этой модели"""
+    name = instance._meta.model_name
+    return [f'{name}:{instance.pk}', f'{name}-list']
+
+
+def versions(keys):
+    """Текущие версии ключей; для новых ключей версии заводятся"""
+    cache = _shared()
+    version_keys = [_version_key(key) for key in keys]
+    found = cache.get_many(version_keys)
+    missing = [version_key for version_key in version_keys if version_key not in found]
+    if missing:
+        # add не перезапишет версию, которую успел завести другой процесс
+        for version_key in missing:
+            cache.add(version_key, uuid.uuid4().hex, None)
+        found.update(cache.get_many(missing))
+    return [found.get(version_key, '') for version_key in version_keys]
+
+
+def lookup(name, keys):
+    """
+    (ключ записи, значение или None) для записи name, помеченной ключами keys.
+    Ключ записи передаётся в store(), если значение пришлось получить заново.
+    """
+    parts = [name] + [f'{key}={version}' for key, version in zip(keys, versions(keys))]
+    entry_key = 'page:' + hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    local = _local()
+    value = local.get(entry_key)
+    if value is None:
+        value = _shared().get(entry_key)
+        if value is not None:
+            local.set(entry_key, value, settings.PAGE_CACHE_LOCAL_TIMEOUT)
+    return entry_key, value
+
+
+def store(entry_key, value, timeout=None):
+    """Сохраняет запись в оба уровня"""
+    _shared().set(entry_key, value, timeout or settings.PAGE_CACHE_TIMEOUT)
+    _local().set(entry_key, value, settings.PAGE_CACHE_LOCAL_TIMEOUT)
+
+
+def get_or_set(name, keys, produce, timeout=None):
+    """Фрагмент из кэша или результат produce(), сохранённый под ключами keys"""
+    entry_key, value = lookup(name, keys)
+    if value is None:
+        with use_primary():
+            value = produce()
+        store(entry_key, value, timeout)
+    return value
+
+
+def purge(*keys):
+    """Сбрасывает все записи, помеченные любым из ключей"""
+    _shared().set_many({_version_key(key): uuid.uuid4().hex for key in keys}, None)
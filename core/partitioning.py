@@ -0,0 +1,240 @@
+"""
+Секционирование таблиц core_image и core_file по месяцам (только PostgreSQL).
+
+Схема после преобразования (manage.py partition_media --convert):
+
+    core_image                          PARTITION BY RANGE (created_at)
+    ├── core_image_p2026_10             свежие месяцы — обычные секции
+    ├── core_image_p2025_01             месяцы старше MEDIA_ARCHIVE_AFTER_DAYS,
+    │   ├── core_image_p2025_01_active      PARTITION BY LIST (is_active)
+    │   └── core_image_p2025_01_archive     сюда уходят неактивные записи
+    └── core_image_default              всё, что не попало в месячные секции
+
+Первичный ключ — (id, created_at, is_active): PostgreSQL требует, чтобы
+уникальные ограничения секционированной таблицы включали все ключи
+секционирования. id по-прежнему уникален благодаря последовательности,
+а индекс начинается с id, поэтому поиск по pk остаётся индексным.
+
+Границы месяцев считаются в UTC.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+
+def month_start(value):
+    """Первое число месяца для даты или datetime"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """Сдвигает первое число месяца на months месяцев"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(value):
+    return f"'{value:%Y-%m-%d} 00:00:00+00'"
+
+
+class MediaPartitioner:
+    """
+    Операции над одной секционируемой таблицей.
+    В режиме dry_run SQL только выводится через log и не выполняется.
+    """
+
+    def __init__(self, connection, table, dry_run=False, log=None):
+        self.connection = connection
+        self.table = table
+        self.dry_run = dry_run
+        self.log = log or (lambda message: None)
+        self.name_re = re.compile(rf'^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$')
+
+    # --- Вспомогательные методы ---
+
+    def _query(self, sql, params=None):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _execute(self, *statements):
+        for sql in statements:
+            self.log(sql + ';')
+            if not self.dry_run:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(sql)
+
+    def _qn(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def partition_name(self, month):
+        return f'{self.table}_p{month:%Y_%m}'
+
+    def exists(self, name):
+        return self._query('SELECT to_regclass(%s) IS NOT NULL', [name])[0][0]
+
+    def is_partitioned(self, name=None):
+        return self._query(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))',
+            [name or self.table]
+        )[0][0]
+
+    def columns(self):
+        """Список колонок родительской таблицы через запятую, в порядке объявления"""
+        rows = self._query(
+            'SELECT attname FROM pg_attribute '
+            'WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum',
+            [self.table]
+        )
+        return ', '.join(self._qn(row[0]) for row in rows)
+
+    def month_partitions(self):
+        """Месячные секции: список (месяц, имя, секционирована ли сама секция)"""
+        rows = self._query(
+            'SELECT child.relname, child.relkind = %s FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            ['p', self.table]
+        )
+        partitions = []
+        for name, is_partitioned in rows:
+            match = self.name_re.match(name)
+            if match:
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                partitions.append((month, name, is_partitioned))
+        return sorted(partitions)
+
+    # --- Преобразование обычной таблицы в секционированную ---
+
+    def convert(self, months_ahead):
+        """
+        Пересоздаёт таблицу как секционированную и переносит в неё данные.
+        Всё выполняется в одной транзакции под эксклюзивной блокировкой таблицы.
+        """
+        table = self._qn(self.table)
+        legacy = f'{self.table}_legacy'
+
+        pk_name = self._query(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+            [self.table]
+        )[0][0]
+        indexes = self._query(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+            [self.table, pk_name]
+        )
+        first_created = self._query(f'SELECT min(created_at) FROM {table}')[0][0]
+        columns = self.columns()
+
+        self._execute(
+            f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE',
+            f'ALTER TABLE {table} RENAME TO {self._qn(legacy)}',
+            f'ALTER TABLE {self._qn(legacy)} RENAME CONSTRAINT {self._qn(pk_name)} '
+            f'TO {self._qn(legacy + "_pkey")}',
+            *(f'DROP INDEX {self._qn(name)}' for name, _ in indexes),
+            f'CREATE TABLE {table} (LIKE {self._qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (created_at)',
+            f'ALTER TABLE {table} ADD CONSTRAINT {self._qn(pk_name)} '
+            f'PRIMARY KEY (id, created_at, is_active)',
+        )
+        for name, definition in indexes:
+            if definition.startswith('CREATE UNIQUE'):
+                # Уникальный индекс без ключа секционирования создать нельзя
+                self.log(f'-- пропущен уникальный индекс {name}: {definition}')
+                continue
+            self._execute(definition)
+
+        self._execute(
+            f'CREATE TABLE {self._qn(self.table + "_default")} PARTITION OF {table} DEFAULT'
+        )
+
+        today = month_start(datetime.now(dt_timezone.utc))
+        month = month_start(first_created) if first_created else today
+        while month <= add_months(today, months_ahead):
+            self._execute(self._create_partition_sql(month))
+            month = add_months(month, 1)
+
+        self._execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {self._qn(legacy)}',
+            f"SELECT setval(pg_get_serial_sequence('{self.table}', 'id'), "
+            f'coalesce(max(id), 0) + 1, false) FROM {table}',
+            f'DROP TABLE {self._qn(legacy)}',
+        )
+
+    def _create_partition_sql(self, month):
+        return (
+            f'CREATE TABLE {self._qn(self.partition_name(month))} PARTITION OF {self._qn(self.table)} '
+            f'FOR VALUES FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})'
+        )
+
+    # --- Будущие секции ---
+
+    def ensure_future_partitions(self, months_ahead):
+        """
+        Создаёт секции с текущего месяца на months_ahead месяцев вперёд.
+        Если строки нужного месяца уже лежат в секции по умолчанию,
+        они переносятся в новую секцию.
+        Возвращает список созданных секций.
+        """
+        created = []
+        today = month_start(datetime.now(dt_timezone.utc))
+        for offset in range(months_ahead + 1):
+            month = add_months(today, offset)
+            name = self.partition_name(month)
+            if self.exists(name):
+                continue
+            self._create_partition_from_default(month)
+            created.append(name)
+        return created
+
+    def _create_partition_from_default(self, month):
+        table = self._qn(self.table)
+        partition = self._qn(self.partition_name(month))
+        default = self._qn(self.table + '_default')
+        columns = self.columns()
+        start, end = _bound(month), _bound(add_months(month, 1))
+
+        self._execute(
+            f'CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)',
+            f'WITH moved AS (DELETE FROM {default} WHERE created_at >= {start} AND created_at < {end} '
+            f'RETURNING {columns}) INSERT INTO {partition} ({columns}) SELECT {columns} FROM moved',
+            f'ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM ({start}) TO ({end})',
+        )
+
+    # --- Архивирование ---
+
+    def archive(self, cutoff, tablespace=None):
+        """
+        Делит месячные секции, закончившиеся раньше cutoff, на активную
+        и архивную подсекции по is_active. Неактивные строки уходят в архивную
+        подсекцию (при желании — в отдельное табличное пространство),
+        и индексы активных данных перестают их содержать.
+        Строки, выключенные позже, переезжают в архив автоматически при UPDATE.
+        Возвращает список обработанных секций.
+        """
+        archived = []
+        for month, name, is_partitioned in self.month_partitions():
+            if is_partitioned or add_months(month, 1) > cutoff:
+                continue
+            self._split_partition(month, name, tablespace)
+            archived.append(name)
+        return archived
+
+    def _split_partition(self, month, name, tablespace):
+        table = self._qn(self.table)
+        partition = self._qn(name)
+        old = self._qn(name + '_old')
+        columns = self.columns()
+        tablespace_sql = f' TABLESPACE {self._qn(tablespace)}' if tablespace else ''
+
+        self._execute(
+            f'ALTER TABLE {table} DETACH PARTITION {partition}',
+            f'ALTER TABLE {partition} RENAME TO {old}',
+            f'CREATE TABLE {partition} PARTITION OF {table} '
+            f'FOR VALUES FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))}) '
+            f'PARTITION BY LIST (is_active)',
+            f'CREATE TABLE {self._qn(name + "_active")} PARTITION OF {partition} FOR VALUES IN (true)',
+            f'CREATE TABLE {self._qn(name + "_archive")} PARTITION OF {partition} '
+            f'FOR VALUES IN (false){tablespace_sql}',
+            f'INSERT INTO {partition} ({columns}) SELECT {columns} FROM {old}',
+            f'DROP TABLE {old}',
+        )
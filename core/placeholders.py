@@ -0,0 +1,132 @@
+"""
+Заглушки для ленивой загрузки изображений: BlurHash и доминирующий цвет.
+
+Оба значения считаются один раз фоновой задачей core.tasks.process_image
+по уменьшенной копии изображения и хранятся в модели Image. Шаблон или
+фронтенд резервирует место по width/height и сразу рисует размытую заглушку,
+не делая лишних запросов.
+
+Кодировщик BlurHash — собственная реализация алгоритма
+(https://github.com/woltapp/blurhash), чтобы не тянуть зависимость
+ради нескольких десятков строк.
+"""
+import math
+
+from PIL import Image as PilImage
+
+
+# Сторона уменьшенной копии, по которой считаются заглушки
+SAMPLE_SIZE = 32
+
+# Количество компонент BlurHash по горизонтали и вертикали (1..9)
+X_COMPONENTS = 4
+Y_COMPONENTS = 3
+
+# Сколько цветов оставлять при поиске доминирующего
+PALETTE_COLORS = 5
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _encode83(value, length):
+    return ''.join(_BASE83[value // 83 ** (length - i) % 83] for i in range(1, length + 1))
+
+
+def _srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, x_components=X_COMPONENTS, y_components=Y_COMPONENTS):
+    """BlurHash для уменьшенного RGB-изображения Pillow"""
+    width, height = image.size
+    linear = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in image.get_flattened_data()]
+
+    # Косинусы базисных функций не зависят от цвета — считаем их один раз
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = normalisation * cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pixel = linear[row + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            scale = 1 / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, math.floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max = 0
+        max_value = 1
+    result += _encode83(quantised_max, 1)
+
+    r, g, b = (_linear_to_srgb(value) for value in dc)
+    result += _encode83((r << 16) + (g << 8) + b, 4)
+
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(_sign_pow(value / max_value, 0.5) * 9 + 9.5)))
+            for value in factor
+        )
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def dominant_color(image, colors=PALETTE_COLORS):
+    """Самый частый цвет уменьшенного RGB-изображения в виде #rrggbb"""
+    quantized = image.quantize(colors=colors)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    return '#{:02x}{:02x}{:02x}'.format(*palette[index * 3:index * 3 + 3])
+
+
+def sample(image, size=SAMPLE_SIZE):
+    """
+    Уменьшает открытое изображение до size×size (на месте) и возвращает RGB-копию.
+    Для JPEG draft() декодирует сразу в уменьшенном масштабе,
+    полноразмерный растр в память не попадает.
+    """
+    image.draft('RGB', (size, size))
+    image.thumbnail((size, size))
+    if 'A' in image.getbands() or 'transparency' in image.info:
+        # Прозрачные области показываем на белом фоне
+        background = PilImage.new('RGBA', image.size, (255, 255, 255, 255))
+        return PilImage.alpha_composite(background, image.convert('RGBA')).convert('RGB')
+    return image.convert('RGB')
+
+
+def compute_placeholders(image):
+    """
+    (blurhash, доминирующий цвет) для открытого изображения Pillow.
+    Изображение уменьшается на месте — размеры нужно прочитать до вызова.
+    """
+    small = sample(image)
+    return blurhash(small), dominant_color(small)
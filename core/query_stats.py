@@ -0,0 +1,97 @@
+"""
+Учёт SQL-запросов: количество, суммарное время и повторяющиеся запросы (N+1).
+
+На каждое подключение к базе при его создании (сигнал connection_created)
+ставится обёртка connection.execute_wrapper. Она пишет статистику в сборщик
+текущего контекста (ContextVar), поэтому работает и в синхронных, и в
+асинхронных представлениях — sync_to_async переносит контекст в поток ORM.
+Вне collect_queries() обёртка ничего не делает.
+
+Запросы, отличающиеся только параметрами, сводятся к одному «отпечатку»;
+если отпечаток повторился QUERY_STATS_NPLUSONE_THRESHOLD раз — это похоже на N+1.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger(__name__)
+
+_collector = ContextVar('query_collector', default=None)
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Текст запроса без конкретных значений: списки IN, строки и числа заменены"""
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryCollector:
+    """
+    Статистика запросов одного запроса/блока кода.
+    Вложенный сборщик передаёт запросы и во внешний (parent).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, sql, duration):
+        self.add(fingerprint(sql), duration)
+
+    def add(self, sql_fingerprint, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[sql_fingerprint] += 1
+        if self.parent is not None:
+            self.parent.add(sql_fingerprint, duration)
+
+    def repeated(self, threshold=None):
+        """Отпечатки, повторившиеся не меньше threshold раз: [(отпечаток, количество)]"""
+        threshold = threshold or settings.QUERY_STATS_NPLUSONE_THRESHOLD
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+def query_wrapper(execute, sql, params, many, context):
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.record(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    # Сигнал приходит и при переподключении — обёртка уже может стоять
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+@contextmanager
+def collect_queries():
+    """Собирает статистику запросов внутри блока (в том числе из sync_to_async)"""
+    collector = QueryCollector(parent=_collector.get())
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
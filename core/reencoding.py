@@ -0,0 +1,87 @@
+"""
+Перекодирование библиотеки изображений в современные форматы (manage.py reencode_images).
+
+Функции модуля выполняются в процессах пула (spawn), где Django не настроен.
+Декодирование идёт через core.imaging (чтение заголовка, лимит пикселей,
+бюджет памяти), но лимиты передаются в init_worker() из родителя —
+настройки в процессе пула не читаются. Pillow загружается при первом вызове.
+"""
+import os
+import signal
+
+from . import imaging
+
+
+# Форматы, в которые перекодируем: (расширение, значение Image.file_type, параметры save())
+TARGET_FORMATS = {
+    'webp': ('.webp', 'WEBP', {'method': 6}),
+    'avif': ('.avif', 'AVIF', {'speed': 6}),
+}
+
+# Что имеет смысл перекодировать по умолчанию. GIF пропускаем (анимация), SVG — вектор
+SOURCE_TYPES = ('BMP', 'PNG', 'JPEG')
+
+
+# Лимиты процесса пула, заданные в init_worker()
+_max_pixels = None
+_decode_timeout = None
+
+
+def init_worker(memory_budget=None, max_pixels=None, decode_timeout=None):
+    """
+    Инициализатор процесса пула. Ctrl-C в терминале получает вся группа процессов;
+    останавливает обход только родитель (после текущей пачки), воркеры дорабатывают.
+    memory_budget — бюджет памяти под растры (байты), у каждого процесса свой.
+    """
+    global _max_pixels, _decode_timeout
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_budget is not None:
+        imaging.budget = imaging.MemoryBudget(memory_budget)
+    _max_pixels, _decode_timeout = max_pixels, decode_timeout
+
+
+def reencode(source_path, target_path, target_format, quality):
+    """
+    Перекодирует файл source_path в target_path.
+    Возвращает размер результата в байтах. Ориентация (EXIF) и цветовой профиль сохраняются.
+    """
+    extension, _, options = TARGET_FORMATS[target_format]
+    with open(source_path, 'rb') as file, imaging.open_image(file) as img:
+        # Анимированные изображения не трогаем — WebP/AVIF их поддерживают, но кадры потеряются
+        if getattr(img, 'is_animated', False):
+            raise ValueError('анимированное изображение')
+        width, height = img.size
+        if _max_pixels and width * height > _max_pixels:
+            raise imaging.ImageTooLarge(f'{width}×{height} больше {_max_pixels} пикселей')
+        exif = img.info.get('exif')
+        icc_profile = img.info.get('icc_profile')
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+
+        save_options = dict(options, quality=quality)
+        if exif:
+            save_options['exif'] = exif
+        if icc_profile:
+            save_options['icc_profile'] = icc_profile
+        # Через временный файл: наполовину записанный результат не окажется под итоговым именем
+        temporary_path = f'{target_path}.{os.getpid()}.tmp'
+        try:
+            with imaging.decode(img, timeout=_decode_timeout):
+                img.convert('RGBA' if has_alpha else 'RGB').save(
+                    temporary_path, format=target_format.upper(), **save_options
+                )
+            os.replace(temporary_path, target_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+    return os.path.getsize(target_path)
+
+
+def reencode_job(image_id, source_path, target_path, target_format, quality):
+    """
+    Задача для пула процессов: (id, размер результата или None, ошибка или None).
+    Исключения не пробрасываются — одна битая картинка не должна останавливать обход.
+    """
+    try:
+        return image_id, reencode(source_path, target_path, target_format, quality), None
+    except Exception as e:
+        return image_id, None, f'{type(e).__name__}: {e}'
@@ -0,0 +1,77 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Флаг «читать только с основной базы» для текущего запроса.
+# ContextVar, а не threading.local, чтобы флаг корректно работал и в async-коде.
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def pin_to_primary(value=True):
+    """Закрепляет (или открепляет) текущий контекст за основной базой"""
+    _pinned_to_primary.set(value)
+
+
+def is_pinned_to_primary():
+    """Читает ли текущий контекст только с основной базы"""
+    return _pinned_to_primary.get()
+
+
+@contextmanager
+def use_primary():
+    """
+    Временно отправляет все чтения на основную базу.
+    Пригодится, когда нужно прочитать только что записанные данные.
+    """
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def read_replica():
+    """
+    Алиас для чтения, которому отставание реплики не мешает (выгрузки):
+    случайная реплика даже в закреплённом за основной базой контексте,
+    без реплик — основная база.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтение тяжёлых моделей (медиа и пользователи) на реплики,
+    а всё остальное — на основную базу.
+
+    После любой записи контекст закрепляется за основной базой,
+    чтобы пользователь сразу видел свои изменения (read-your-writes).
+    Между запросами закрепление переносит ReplicaPinningMiddleware.
+    """
+
+    def _is_routed(self, model):
+        return model._meta.label in settings.REPLICA_ROUTED_MODELS
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned_to_primary() or not self._is_routed(model):
+            # None — Django сам выберет базу (default или базу объекта-подсказки)
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Миграции применяются только к основной базе и доходят до реплик репликацией
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,261 @@
+"""
+Генерация синтетических данных для нагрузочных тестов (manage.py seed_data).
+
+Строки грузятся в PostgreSQL через COPY пачками, минуя save() и сигналы,
+поэтому:
+- id не передаём — их выдаёт identity/sequence таблицы, последовательности
+  остаются согласованными;
+- флаги is_staff/is_superuser считаются тем же правилом, что и в User.save()
+  (User.role_flags);
+- счётчики StorageUsage после загрузки пересчитываются целиком.
+
+Файлы на диске настоящие, но маленькие: для каждого формата заранее
+готовится небольшой набор шаблонов, и каждая строка получает копию одного
+из них (с совпадающими размером, шириной, высотой и заглушкой).
+"""
+import io
+import os
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from PIL import Image as PilImage
+
+from .models import Image
+from .placeholders import compute_placeholders
+
+
+# Строк в одной команде COPY (и в одной транзакции)
+COPY_BATCH_SIZE = 20_000
+
+# Шаблонов файлов на каждый формат
+TEMPLATES_PER_FORMAT = 8
+
+# За какой период распределять даты создания
+HISTORY_DAYS = 2 * 365
+
+# (формат Pillow, расширение, тип файла в модели, вес)
+IMAGE_FORMATS = (
+    ('JPEG', 'jpg', 'JPEG', 60),
+    ('PNG', 'png', 'PNG', 25),
+    ('WEBP', 'webp', 'WEBP', 10),
+    ('GIF', 'gif', 'GIF', 5),
+)
+
+# (расширение, тип файла в модели, вес)
+DOCUMENT_FORMATS = (
+    ('pdf', 'PDF', 40),
+    ('docx', 'DOCX', 20),
+    ('xlsx', 'XLSX', 15),
+    ('txt', 'TXT', 10),
+    ('pptx', 'PPTX', 5),
+    ('doc', 'DOC', 4),
+    ('xls', 'XLS', 3),
+    ('odt', 'ODT', 2),
+    ('rtf', 'RTF', 1),
+)
+
+USER_ROLES = (('content_manager', 70), ('crm_manager', 25), ('admin', 5))
+
+WORDS = (
+    'Офис', 'Команда', 'Продукт', 'Конференция', 'Склад', 'Логотип', 'Баннер',
+    'Отчёт', 'Презентация', 'Договор', 'Прайс-лист', 'Каталог', 'Выставка',
+    'Производство', 'Партнёры', 'Сертификат', 'Инструкция', 'Новости', 'Вакансии',
+    'Клиенты', 'Проект', 'Годовой', 'Квартальный', 'Рекламный', 'Технический',
+)
+FIRST_NAMES = ('anna', 'ivan', 'maria', 'petr', 'olga', 'sergey', 'elena', 'dmitry', 'irina', 'alexey')
+LAST_NAMES = ('ivanov', 'petrov', 'sidorov', 'smirnov', 'kuznetsov', 'popov', 'volkov', 'sokolov')
+
+
+def _weighted(rng, pairs):
+    """Случайное значение из пар (значение, вес)"""
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+def _copy_value(value):
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def copy_rows(connection, model, rows):
+    """
+    Загружает строки (словари {attname: значение}) в таблицу модели одной командой COPY.
+    Поля, которых нет в строке, получают значение по умолчанию; id — из sequence.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    defaults = {field.attname: field.get_default() for field in fields}
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(
+            _copy_value(row[field.attname] if field.attname in row else defaults[field.attname])
+            for field in fields
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _random_datetime(rng, now):
+    return now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 60 * 60))
+
+
+def _upload_path(prefix, created_at, name):
+    return f'{prefix}/{timezone.localtime(created_at):%Y/%m/%d}/{name}'
+
+
+def image_templates(rng):
+    """Шаблоны изображений: {тип: [(байты, метаданные)]}"""
+    templates = {}
+    for pil_format, extension, file_type, _ in IMAGE_FORMATS:
+        templates[file_type] = []
+        for _ in range(TEMPLATES_PER_FORMAT):
+            size = (rng.randrange(64, 513), rng.randrange(64, 513))
+            color = tuple(rng.randrange(256) for _ in range(3))
+            image = PilImage.radial_gradient('L').resize(size).convert('RGB')
+            image = PilImage.blend(image, PilImage.new('RGB', size, color), 0.6)
+            buffer = io.BytesIO()
+            (image.convert('P') if pil_format == 'GIF' else image).save(buffer, pil_format)
+            placeholder, dominant_color = compute_placeholders(image.copy())
+            templates[file_type].append((buffer.getvalue(), {
+                'extension': extension,
+                'width': size[0],
+                'height': size[1],
+                'placeholder': placeholder,
+                'dominant_color': dominant_color,
+            }))
+    return templates
+
+
+def document_templates(rng):
+    """Шаблоны документов: {тип: [(байты, метаданные)]}"""
+    templates = {}
+    for extension, file_type, _ in DOCUMENT_FORMATS:
+        templates[file_type] = []
+        for _ in range(TEMPLATES_PER_FORMAT):
+            size = rng.randrange(1024, 64 * 1024)
+            if file_type == 'TXT':
+                content = ' '.join(rng.choice(WORDS) for _ in range(size // 10)).encode()
+            elif file_type == 'PDF':
+                content = b'%PDF-1.4\n' + rng.randbytes(size) + b'\n%%EOF\n'
+            else:
+                content = rng.randbytes(size)
+            templates[file_type].append((content, {'extension': extension}))
+    return templates
+
+
+def generate_images(rng, templates, count, first_number):
+    """Строки Image и файлы для них: (строки, [(путь, байты)])"""
+    now = timezone.now()
+    rows, files = [], []
+    for number in range(first_number, first_number + count):
+        file_type = _weighted(rng, [(file_type, weight) for _, _, file_type, weight in IMAGE_FORMATS])
+        content, meta = rng.choice(templates[file_type])
+        created_at = _random_datetime(rng, now)
+        path = _upload_path('images', created_at, f'seed_{number}.{meta["extension"]}')
+        title = ' '.join(rng.sample(WORDS, 2))
+        rows.append({
+            'image': path,
+            'title': title,
+            'alt_text': f'{title} — фото {number}',
+            'width': meta['width'],
+            'height': meta['height'],
+            'placeholder': meta['placeholder'],
+            'dominant_color': meta['dominant_color'],
+            'file_size': len(content),
+            'file_type': file_type,
+            'processing_status': Image.ProcessingStatus.READY,
+            'is_active': rng.random() < 0.9,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+        files.append((path, content))
+    return rows, files
+
+
+def generate_files(rng, templates, count, first_number):
+    """Строки File и файлы для них: (строки, [(путь, байты)])"""
+    now = timezone.now()
+    rows, files = [], []
+    for number in range(first_number, first_number + count):
+        file_type = _weighted(rng, [(file_type, weight) for _, file_type, weight in DOCUMENT_FORMATS])
+        content, meta = rng.choice(templates[file_type])
+        created_at = _random_datetime(rng, now)
+        path = _upload_path('files', created_at, f'seed_{number}.{meta["extension"]}')
+        name = ' '.join(rng.sample(WORDS, 3))
+        rows.append({
+            'file': path,
+            'name': name,
+            'description': f'{name} (документ {number})',
+            'file_size': len(content),
+            'file_type': file_type,
+            'is_active': rng.random() < 0.9,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+        files.append((path, content))
+    return rows, files
+
+
+def generate_users(rng, count, first_number, password):
+    """Строки пользователей; флаги по роли — как в User.save()"""
+    User = get_user_model()
+    now = timezone.now()
+    rows = []
+    for number in range(first_number, first_number + count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f'{first_name}.{last_name}{number}'
+        role = _weighted(rng, USER_ROLES)
+        is_staff, is_superuser = User.role_flags(role)
+        date_joined = _random_datetime(rng, now)
+        rows.append({
+            'username': username,
+            'email': f'{username}@example.com',
+            'first_name': first_name.capitalize(),
+            'last_name': last_name.capitalize(),
+            'password': password,
+            'role': role,
+            'phone': f'+7{rng.randrange(10 ** 9, 10 ** 10)}',
+            'is_staff': is_staff,
+            'is_superuser': is_superuser,
+            'is_active': rng.random() < 0.95,
+            'date_joined': date_joined,
+            'last_login': date_joined + timedelta(days=rng.randrange(30)) if rng.random() < 0.7 else None,
+        })
+    return rows
+
+
+def write_files(executor, storage, files):
+    """
+    Запускает запись файлов в пуле потоков executor; возвращает futures.
+    Запись — чистый ввод-вывод, GIL отпускается, поэтому потоков достаточно.
+    """
+    directories = {os.path.dirname(storage.path(path)) for path, _ in files}
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    def write(path, content):
+        with open(storage.path(path), 'wb') as f:
+            f.write(content)
+
+    return [executor.submit(write, path, content) for path, content in files]
@@ -1,34 +1,36 @@
-import os
-import shutil
-from pathlib import Path
-from django.db.models.signals import pre_delete, post_delete, pre_save
+from django.db.models.signals import pre_delete, post_delete, pre_save, post_save
 from django.dispatch import receiver
-from django.core.files.storage import default_storage
-from django.db import connection
-from .models import Image, File
+from django.db import transaction
+from . import page_cache
+from .metrics import timed_receiver
+from .models import Image, File, SiteConfiguration
+from .site_config import invalidate_site_config
+from .tasks import schedule_file_removal
+from . import storage_stats
 
 
 @receiver(pre_delete, sender=Image)
+@timed_receiver
 def cleanup_image_files(sender, instance, **kwargs):
-    """Удаляет файл изображения с диска при удалении записи"""
+    """
+    Удаляет файл изображения с диска при удалении записи.
+    Само удаление (и чистку пустых директорий) выполняет фоновая задача
+    после коммита — одна на все файлы транзакции.
+    """
     if instance.image:
-        file_path = instance.image.path
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f'Удалён файл изображения: {file_path}')
+        schedule_file_removal(instance.image.path)
 
 
 @receiver(pre_delete, sender=File)
+@timed_receiver
 def cleanup_file_files(sender, instance, **kwargs):
-    """Удаляет файл документа с диска при удалении записи"""
+    """Удаляет файл документа с диска при удалении записи (в фоне, после коммита)"""
     if instance.file:
-        file_path = instance.file.path
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f'Удалён файл документа: {file_path}')
+        schedule_file_removal(instance.file.path)
 
 
 @receiver(pre_save, sender=Image)
+@timed_receiver
 def cleanup_old_image_on_change(sender, instance, **kwargs):
     """Удаляет старый файл изображения при замене на новый"""
     if not instance.pk:
@@ -38,15 +40,16 @@ def cleanup_old_image_on_change(sender, instance, **kwargs):
         old_instance = Image.objects.get(pk=instance.pk)
     except Image.DoesNotExist:
         return
-    
+
+    # Запоминаем прежнее состояние для счётчиков StorageUsage
+    instance._storage_state = storage_stats.usage_state(old_instance)
+
     if old_instance.image and old_instance.image != instance.image:
-        old_path = old_instance.image.path
-        if os.path.exists(old_path):
-            os.remove(old_path)
-            print(f'Удалён старый файл изображения при замене: {old_path}')
+        schedule_file_removal(old_instance.image.path)
 
 
 @receiver(pre_save, sender=File)
+@timed_receiver
 def cleanup_old_file_on_change(sender, instance, **kwargs):
     """Удаляет старый файл документа при замене на новый"""
     if not instance.pk:
@@ -56,65 +59,52 @@ def cleanup_old_file_on_change(sender, instance, **kwargs):
         old_instance = File.objects.get(pk=instance.pk)
     except File.DoesNotExist:
         return
-    
+
+    # Запоминаем прежнее состояние для счётчиков StorageUsage
+    instance._storage_state = storage_stats.usage_state(old_instance)
+
     if old_instance.file and old_instance.file != instance.file:
-        old_path = old_instance.file.path
-        if os.path.exists(old_path):
-            os.remove(old_path)
-            print(f'Удалён старый файл документа при замене: {old_path}')
+        schedule_file_removal(old_instance.file.path)
 
 
-def cleanup_empty_directories(path, max_depth=3):
-    """
-    Рекурсивно удаляет пустые директории, поднимаясь вверх по пути.
-    max_depth - ограничивает, как далеко вверх можно подниматься
-    """
-    if max_depth <= 0:
-        return
-    
-    path = Path(path)
-    
-    # Проверяем, существует ли директория
-    if not path.exists() or not path.is_dir():
-        return
-    
-    try:
-        # Если директория пуста
-        if not any(path.iterdir()):
-            # Удаляем её
-            path.rmdir()
-            print(f'Удалена пустая директория: {path}')
-            
-            # Поднимаемся на уровень выше и пробуем удалить родителя
-            cleanup_empty_directories(path.parent, max_depth - 1)
-    except (OSError, PermissionError):
-        # Если не удалось удалить (например, директория не пуста или нет прав)
-        pass
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=File)
+@timed_receiver
+def update_storage_usage_on_save(sender, instance, **kwargs):
+    """Переносит запись в счётчиках StorageUsage из старого состояния в новое"""
+    old_state = instance.__dict__.pop('_storage_state', None)
+    storage_stats.record_change(old_state, storage_stats.usage_state(instance))
 
 
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=File)
 @receiver(post_delete, sender=Image)
-def cleanup_empty_dirs_after_image(sender, instance, **kwargs):
+@receiver(post_delete, sender=File)
+@timed_receiver
+def purge_page_cache(sender, instance, **kwargs):
     """
-    Удаляет пустые директории после удаления файла изображения.
-    Использует транзакцию.on_commit(), чтобы гарантировать,
-    что всё произошло после завершения транзакции.
+    Сбрасывает кэш страниц с этой записью и списков её модели
+    после коммита (почему не сразу — см. core.page_cache).
     """
-    if instance.image:
-        def remove_dirs():
-            dir_path = os.path.dirname(instance.image.path)
-            cleanup_empty_directories(dir_path)
-        
-        # Выполняем после подтверждения транзакции
-        connection.on_commit(remove_dirs)
+    keys = page_cache.model_keys(instance)
+    transaction.on_commit(lambda: page_cache.purge(*keys))
 
 
+@receiver(post_delete, sender=Image)
 @receiver(post_delete, sender=File)
-def cleanup_empty_dirs_after_file(sender, instance, **kwargs):
-    """Удаляет пустые директории после удаления файла документа"""
-    if instance.file:
-        def remove_dirs():
-            dir_path = os.path.dirname(instance.file.path)
-            cleanup_empty_directories(dir_path)
-        
-        # Выполняем после подтверждения транзакции
-        connection.on_commit(remove_dirs)
\ No newline at end of file
+@timed_receiver
+def update_storage_usage_on_delete(sender, instance, **kwargs):
+    """Вычитает удалённую запись из счётчиков StorageUsage"""
+    storage_stats.record_change(storage_stats.usage_state(instance), None)
+
+
+@receiver(post_save, sender=SiteConfiguration)
+@receiver(post_delete, sender=SiteConfiguration)
+@timed_receiver
+def invalidate_site_config_cache(sender, **kwargs):
+    """
+    Публикует новую версию настроек сайта для всех процессов, когда транзакция
+    закоммичена: первый процесс, увидевший версию, читает get_solo() и кладёт
+    объект под ключ версии на сутки — он должен прочитать уже сохранённые значения.
+    """
+    transaction.on_commit(invalidate_site_config)
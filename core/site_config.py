@@ -0,0 +1,71 @@
+"""
+Кэширование настроек сайта (SiteConfiguration).
+
+Два уровня кэша:
+1. Локальный кэш процесса — сам объект и номер его версии.
+2. Общий кэш (settings.SITE_CONFIG_CACHE) — номер текущей версии и объект
+   под ключом с этой версией.
+
+При сохранении настроек (после коммита транзакции) в общий кэш
+записывается новая версия. Процесс сверяет свою версию с общей
+не чаще раза в SITE_CONFIG_LOCAL_TTL секунд, поэтому на горячем пути
+нет ни запросов к базе, ни обращений к общему кэшу.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import SiteConfiguration
+
+
+VERSION_KEY = 'site_config:version'
+
+# Объекты старых версий просто истекают
+OBJECT_TIMEOUT = 60 * 60 * 24
+
+# (объект, версия, время последней сверки) — заменяется целиком,
+# поэтому чтение из разных потоков безопасно без блокировок
+_local = (None, None, 0.0)
+
+
+def _object_key(version):
+    return f'site_config:{version}'
+
+
+def _cache():
+    return caches[settings.SITE_CONFIG_CACHE]
+
+
+def get_site_config():
+    """Текущие настройки сайта"""
+    global _local
+    config, local_version, checked_at = _local
+    now = time.monotonic()
+
+    if config is not None and now - checked_at < settings.SITE_CONFIG_LOCAL_TTL:
+        return config
+
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Версии ещё нет (холодный кэш) — заводим; add не перезапишет чужую
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    if config is None or version != local_version:
+        config = cache.get(_object_key(version))
+        if config is None:
+            config = SiteConfiguration.get_solo()
+            cache.set(_object_key(version), config, OBJECT_TIMEOUT)
+
+    _local = (config, version, now)
+    return config
+
+
+def invalidate_site_config():
+    """Публикует новую версию настроек для всех процессов"""
+    global _local
+    _cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+    _local = (None, None, 0.0)
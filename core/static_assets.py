@@ -0,0 +1,198 @@
+"""
+Статика: хешированные имена, предварительное сжатие и раздача с долгим кэшем.
+
+При collectstatic хранилище CompressedManifestStaticFilesStorage:
+1. как ManifestStaticFilesStorage, копирует файлы под именами с хешем
+   содержимого (admin/css/base.5af66c1b1797.css) и пишет staticfiles.json;
+2. сжимает текстовые файлы в gzip и brotli (если установлен пакет brotli)
+   рядом с оригиналом — base.5af66c1b1797.css.gz / .br. Сжатие идёт в пуле
+   потоков: zlib и brotli отпускают GIL. Уже сжатые и не изменившиеся
+   файлы повторно не сжимаются.
+
+Представление serve_static отдаёт файлы из STATIC_ROOT: выбирает .br или .gz
+по Accept-Encoding, для файлов с хешем в имени ставит
+Cache-Control: immutable — браузер больше не перепроверяет их вовсе.
+
+За nginx то же самое без участия приложения:
+
+    location /static/ {
+        alias /srv/app/staticfiles/;
+        gzip_static on;
+        brotli_static on;   # модуль ngx_brotli
+        add_header Vary Accept-Encoding;
+        location ~ "\\.[0-9a-f]{12}\\.\\w+$" {
+            add_header Cache-Control "public, max-age=31536000, immutable";
+            add_header Vary Accept-Encoding;
+        }
+    }
+"""
+import gzip
+import importlib.util
+import mimetypes
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles import views as staticfiles_views
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+# Что имеет смысл сжимать: картинки (кроме svg) и шрифты woff/woff2 уже сжаты
+COMPRESSIBLE_EXTENSIONS = frozenset((
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot', '.otf',
+))
+
+# Меньше этого размера сжатие не окупает заголовок Content-Encoding
+MIN_COMPRESS_SIZE = 256
+
+# Сжатый вариант сохраняется, только если он хотя бы на 5% меньше оригинала
+MAX_COMPRESSED_RATIO = 0.95
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+# (Content-Encoding, расширение сжатого файла) в порядке предпочтения
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compress_gzip(data):
+    # mtime=0 — одинаковый результат при каждом collectstatic
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_brotli(data):
+    # Импорт только при collectstatic: модуль подключается из config.urls при старте каждого воркера
+    import brotli
+
+    return brotli.compress(data, quality=11)
+
+
+def brotli_available():
+    """Установлен ли пакет brotli (проверка без импорта)"""
+    return importlib.util.find_spec('brotli') is not None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который после collectstatic сжимает файлы в gzip и brotli"""
+
+    compress_workers = None
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # И оригинальные имена, и имена с хешем: без манифеста в шаблонах
+        # (например, сторонний код со ссылками на оригиналы) сжатие тоже пригодится
+        names = set(paths) | set(self.hashed_files.values())
+        compressors = [('.gz', _compress_gzip)]
+        if brotli_available():
+            compressors.append(('.br', _compress_brotli))
+        jobs = [
+            (name, suffix, compress)
+            for name in names if self.is_compressible(name)
+            for suffix, compress in compressors
+        ]
+        workers = self.compress_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='static-compress') as executor:
+            # list() — чтобы исключения из потоков не потерялись
+            list(executor.map(lambda job: self.compress_file(*job), jobs))
+
+    def is_compressible(self, name):
+        return os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+    def compress_file(self, name, suffix, compress):
+        """Пишет name + suffix рядом с файлом, если сжатие того стоит"""
+        path = self.path(name)
+        compressed_path = path + suffix
+        if (
+            os.path.exists(compressed_path)
+            and os.path.getmtime(compressed_path) >= os.path.getmtime(path)
+        ):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        compressed = compress(data)
+        if len(compressed) > len(data) * MAX_COMPRESSED_RATIO:
+            return
+        # Через временный файл: параллельный воркер не увидит наполовину записанный файл
+        temporary_path = f'{compressed_path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temporary_path, compressed_path)
+
+    @cached_property
+    def immutable_names(self):
+        """Имена с хешем содержимого — их содержимое по этому имени никогда не меняется"""
+        return frozenset(self.hashed_files.values())
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент принимает (q > 0)"""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if encoding and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+@require_safe
+def serve_static(request, path):
+    """Файл из STATIC_ROOT с выбором сжатого варианта и долгим кэшем для имён с хешем"""
+    if settings.DEBUG:
+        # В разработке STATIC_ROOT обычно пуст — файлы ищутся в приложениях
+        return staticfiles_views.serve(request, path)
+
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    if path in getattr(staticfiles_storage, 'immutable_names', ()):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = REVALIDATE_CACHE_CONTROL
+
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['Cache-Control'] = cache_control
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    content_encoding = None
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            full_path += suffix
+            content_encoding = encoding
+            break
+
+    response = FileResponse(
+        open(full_path, 'rb'), content_type=content_type, filename=posixpath.basename(path),
+    )
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = cache_control
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
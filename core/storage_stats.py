@@ -0,0 +1,156 @@
+"""
+Инкрементальная статистика занятого места (модель StorageUsage).
+
+Вместо SUM(file_size) по всей таблице при каждом просмотре держим
+небольшую таблицу счётчиков и меняем её на дельты при сохранении
+и удалении записей — в той же транзакции, что и сами изменения.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import File, Image, StorageUsage
+
+
+MODEL_NAMES = {
+    Image: StorageUsage.ModelName.IMAGE,
+    File: StorageUsage.ModelName.FILE,
+}
+
+
+def usage_state(instance):
+    """
+    Ключ счётчика и размер файла для записи:
+    ((model_name, file_type, month, is_active), file_size)
+    """
+    month = timezone.localtime(instance.created_at).date().replace(day=1)
+    key = (MODEL_NAMES[type(instance)], instance.file_type, month, instance.is_active)
+    return key, instance.file_size or 0
+
+
+def apply_delta(key, files_delta, bytes_delta):
+    """Прибавляет дельты к счётчику, создавая строку при необходимости"""
+    if not files_delta and not bytes_delta:
+        return
+
+    model_name, file_type, month, is_active = key
+    counters = StorageUsage.objects.filter(
+        model_name=model_name, file_type=file_type, month=month, is_active=is_active
+    )
+    changes = {
+        'files_count': F('files_count') + files_delta,
+        'total_bytes': F('total_bytes') + bytes_delta,
+    }
+    if counters.update(**changes):
+        return
+
+    try:
+        with transaction.atomic():
+            StorageUsage.objects.create(
+                model_name=model_name, file_type=file_type, month=month, is_active=is_active,
+                files_count=files_delta, total_bytes=bytes_delta,
+            )
+    except IntegrityError:
+        # Строку успела создать параллельная транзакция
+        counters.update(**changes)
+
+
+def record_change(old_state, new_state):
+    """
+    Переносит запись из старого состояния в новое.
+    old_state — None для новой записи, new_state — None для удалённой.
+    """
+    if old_state == new_state:
+        return
+    if old_state:
+        key, size = old_state
+        apply_delta(key, -1, -size)
+    if new_state:
+        key, size = new_state
+        apply_delta(key, 1, size)
+
+
+def count_usage(usage_model, model_names):
+    """
+    Несохранённые строки счётчиков, посчитанные по самим таблицам медиа.
+    Модели передаются явно, чтобы миграция могла подставить исторические:
+    usage_model — StorageUsage, model_names — {модель: model_name}.
+    """
+    rows = []
+    for model, model_name in model_names.items():
+        groups = (
+            model.objects
+            .order_by()
+            .values('file_type', 'is_active', month=TruncMonth('created_at', output_field=DateField()))
+            .annotate(files_count=Count('id'), total_bytes=Coalesce(Sum('file_size'), 0))
+        )
+        rows.extend(usage_model(model_name=model_name, **group) for group in groups)
+    return rows
+
+
+def rebuild():
+    """Пересчитывает все счётчики с нуля. Возвращает количество строк."""
+    rows = count_usage(StorageUsage, MODEL_NAMES)
+    with transaction.atomic():
+        StorageUsage.objects.all().delete()
+        StorageUsage.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def dashboard_data(months=12, largest=10):
+    """Данные для страницы статистики: только таблица счётчиков и два индексных запроса"""
+    counters = StorageUsage.objects.order_by()
+
+    totals = {
+        row['model_name']: row
+        for row in counters.values('model_name').annotate(
+            files_count=Sum('files_count'), total_bytes=Sum('total_bytes')
+        )
+    }
+    by_type = list(
+        counters.values('model_name', 'file_type')
+        .annotate(files_count=Sum('files_count'), total_bytes=Sum('total_bytes'))
+        .order_by('-total_bytes')
+    )
+    by_status = {
+        row['is_active']: row
+        for row in counters.values('is_active').annotate(
+            files_count=Sum('files_count'), total_bytes=Sum('total_bytes')
+        )
+    }
+
+    by_month = list(
+        counters.values('month')
+        .annotate(files_count=Sum('files_count'), total_bytes=Sum('total_bytes'))
+        .order_by('-month')[:months]
+    )
+    by_month.reverse()
+    # Накопленный объём по месяцам (рост хранилища)
+    running = 0
+    if by_month:
+        running = counters.filter(month__lt=by_month[0]['month']).aggregate(
+            total=Sum('total_bytes')
+        )['total'] or 0
+    for row in by_month:
+        running += row['total_bytes']
+        row['cumulative_bytes'] = running
+
+    return {
+        'totals': [
+            {
+                'label': label,
+                'files_count': totals.get(value, {}).get('files_count') or 0,
+                'total_bytes': totals.get(value, {}).get('total_bytes') or 0,
+            }
+            for value, label in StorageUsage.ModelName.choices
+        ],
+        'by_type': by_type,
+        'active': by_status.get(True),
+        'inactive': by_status.get(False),
+        'by_month': by_month,
+        'largest_images': Image.objects.filter(file_size__isnull=False)
+            .order_by('-file_size').only('id', 'title', 'alt_text', 'file_size', 'file_type')[:largest],
+        'largest_files': File.objects.filter(file_size__isnull=False)
+            .order_by('-file_size').only('id', 'name', 'file_size', 'file_type')[:largest],
+    }
@@ -0,0 +1,157 @@
+"""
+Бэкенд django.tasks, хранящий задачи в базе (модель QueuedTask).
+
+Подключается в settings.TASKS:
+
+    TASKS = {
+        'default': {
+            'BACKEND': 'core.task_backend.DatabaseBackend',
+            'OPTIONS': {'MAX_ATTEMPTS': 3, 'RETRY_DELAY': 30},
+        }
+    }
+
+Задачи выполняет отдельный процесс manage.py run_tasks.
+Запись о задаче создаётся в текущей транзакции, поэтому обработчик
+не увидит задачу, пока транзакция не зафиксирована.
+"""
+from datetime import timedelta
+from traceback import format_exception
+
+from django.db import transaction
+from django.db.models import Q
+from django.tasks import TaskContext, TaskResult, TaskResultStatus
+from django.tasks.backends.base import BaseTaskBackend
+from django.tasks.base import TaskError
+from django.tasks.exceptions import TaskResultDoesNotExist
+from django.tasks.signals import task_enqueued, task_finished, task_started
+from django.utils import timezone
+from django.utils.json import normalize_json
+from django.utils.module_loading import import_string
+
+from .models import QueuedTask
+
+
+class DatabaseBackend(BaseTaskBackend):
+    supports_defer = True
+    supports_get_result = True
+    supports_priority = True
+
+    def __init__(self, alias, params):
+        super().__init__(alias, params)
+        # Сколько раз запускать задачу, прежде чем признать её проваленной
+        self.max_attempts = self.options.get('MAX_ATTEMPTS', 3)
+        # Пауза перед повтором (секунды), удваивается с каждой попыткой
+        self.retry_delay = self.options.get('RETRY_DELAY', 30)
+        # Через сколько секунд задача в статусе RUNNING считается брошенной
+        # (обработчик упал) и выдаётся снова
+        self.stale_after = self.options.get('STALE_AFTER', 60 * 60)
+
+    def enqueue(self, task, args, kwargs):
+        self.validate_task(task)
+
+        record = QueuedTask.objects.create(
+            task_path=task.module_path,
+            backend=self.alias,
+            queue_name=task.queue_name,
+            priority=task.priority,
+            run_after=task.run_after,
+            args=normalize_json(args),
+            kwargs=normalize_json(kwargs),
+        )
+        task_result = self.to_task_result(record, task)
+        task_enqueued.send(type(self), task_result=task_result)
+        return task_result
+
+    def get_result(self, result_id):
+        try:
+            record = QueuedTask.objects.get(pk=result_id, backend=self.alias)
+        except (QueuedTask.DoesNotExist, ValueError):
+            raise TaskResultDoesNotExist(result_id)
+        return self.to_task_result(record)
+
+    def to_task_result(self, record, task=None):
+        """TaskResult по записи очереди"""
+        task = task or import_string(record.task_path)
+        task_result = TaskResult(
+            task=task.using(priority=record.priority, queue_name=record.queue_name),
+            id=str(record.pk),
+            status=TaskResultStatus(record.status),
+            enqueued_at=record.enqueued_at,
+            started_at=record.started_at,
+            finished_at=record.finished_at,
+            last_attempted_at=record.last_attempted_at,
+            args=record.args,
+            kwargs=record.kwargs,
+            backend=self.alias,
+            errors=[TaskError(**error) for error in record.errors],
+            worker_ids=list(record.worker_ids),
+        )
+        object.__setattr__(task_result, '_return_value', record.return_value)
+        return task_result
+
+    # --- Методы для обработчика (manage.py run_tasks) ---
+
+    def claim(self, worker_id, queues, limit):
+        """
+        Забирает до limit готовых к запуску задач и помечает их RUNNING.
+        SKIP LOCKED позволяет нескольким обработчикам разбирать очередь параллельно.
+        Возвращает список id задач.
+        """
+        now = timezone.now()
+        available = (
+            Q(status=QueuedTask.Status.READY) & (Q(run_after__isnull=True) | Q(run_after__lte=now))
+        ) | Q(status=QueuedTask.Status.RUNNING, last_attempted_at__lt=now - timedelta(seconds=self.stale_after))
+
+        with transaction.atomic():
+            records = list(
+                QueuedTask.objects
+                .select_for_update(skip_locked=True)
+                .filter(available, backend=self.alias, queue_name__in=queues)
+                .order_by('-priority', 'enqueued_at')[:limit]
+            )
+            for record in records:
+                record.status = QueuedTask.Status.RUNNING
+                record.started_at = record.started_at or now
+                record.last_attempted_at = now
+                record.worker_ids.append(worker_id)
+                record.save(update_fields=['status', 'started_at', 'last_attempted_at', 'worker_ids'])
+        return [record.pk for record in records]
+
+    def run(self, task_id):
+        """Выполняет одну забранную задачу и сохраняет результат"""
+        record = QueuedTask.objects.get(pk=task_id)
+        task_result = self.to_task_result(record)
+        task = task_result.task
+        task_started.send(type(self), task_result=task_result)
+
+        try:
+            if task.takes_context:
+                return_value = task.call(TaskContext(task_result=task_result), *record.args, **record.kwargs)
+            else:
+                return_value = task.call(*record.args, **record.kwargs)
+            record.return_value = normalize_json(return_value)
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            exception_type = type(e)
+            record.errors.append({
+                'exception_class_path': f'{exception_type.__module__}.{exception_type.__qualname__}',
+                'traceback': ''.join(format_exception(e)),
+            })
+            if record.attempts < self.max_attempts:
+                # Повтор с экспоненциальной паузой
+                delay = self.retry_delay * 2 ** (record.attempts - 1)
+                record.status = QueuedTask.Status.READY
+                record.run_after = timezone.now() + timedelta(seconds=delay)
+            else:
+                record.status = QueuedTask.Status.FAILED
+                record.finished_at = timezone.now()
+        else:
+            record.status = QueuedTask.Status.SUCCESSFUL
+            record.finished_at = timezone.now()
+
+        record.save()
+        if record.status != QueuedTask.Status.READY:
+            task_finished.send(type(self), task_result=self.to_task_result(record, task))
+        return record.status
+
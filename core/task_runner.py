@@ -0,0 +1,24 @@
+"""
+Точки входа пула обработчика фоновых задач (manage.py run_tasks).
+
+Модуль намеренно не импортирует модели на уровне модуля: процессы пула
+запускаются через spawn, и при распаковке функций Django в них ещё не настроен.
+"""
+import django
+
+
+def init_process():
+    """Инициализатор процесса пула"""
+    django.setup()
+
+
+def run_task(backend_alias, task_id):
+    """Выполняет одну задачу в потоке или процессе пула"""
+    from django.db import close_old_connections
+    from django.tasks import task_backends
+
+    close_old_connections()
+    try:
+        return task_backends[backend_alias].run(task_id)
+    finally:
+        close_old_connections()
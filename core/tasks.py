@@ -0,0 +1,163 @@
+"""
+Фоновые задачи обработки медиа (django.tasks).
+
+Тяжёлая работа — декодирование изображений, удаление файлов с диска,
+чистка пустых директорий — выполняется обработчиком manage.py run_tasks,
+а не в потоке запроса админки.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.tasks import task
+from django.utils import timezone
+
+from . import imaging, page_cache
+from .metrics import FILES_REMOVED, FILES_SCHEDULED_FOR_REMOVAL, IMAGE_PROCESSING_SECONDS
+from .models import Image
+from .routers import use_primary
+
+
+logger = logging.getLogger(__name__)
+
+
+@task(priority=10, takes_context=True)
+def process_image(context, image_id, image_name):
+    """
+    Читает размеры изображения, считает заглушку для ленивой загрузки
+    (BlurHash и доминирующий цвет) и помечает запись готовой.
+    image_name защищает от гонки: если файл успели заменить,
+    эту задачу пропускаем — для нового файла поставлена своя.
+    """
+    # Pillow нужен только обработчику задач — не загружаем его в веб-процессах при импорте модуля
+    from .placeholders import SAMPLE_SIZE, compute_placeholders
+
+    images = Image.objects.filter(pk=image_id, image=image_name)
+    # update() не трогает auto_now — выставляем updated_at сами (по нему считается ETag API)
+    now = timezone.now()
+    # Запись только что создана — реплика может её ещё не видеть
+    with use_primary():
+        image = images.first()
+    if image is None:
+        return None
+
+    def update(**fields):
+        images.update(updated_at=now, **fields)
+        # update() минует сигналы — кэш страниц с этим изображением сбрасываем сами
+        page_cache.purge(*page_cache.model_keys(image))
+
+    started_at = time.perf_counter()
+    try:
+        with image.image.open('rb') as file, imaging.open_image(file) as img:
+            width, height = img.size
+            # Для заглушек нужна копия 32×32: JPEG декодируется сразу уменьшенным,
+            # остальные форматы — целиком, но в пределах бюджета памяти процесса
+            with imaging.decode(img, size=(SAMPLE_SIZE, SAMPLE_SIZE)):
+                placeholder, color = compute_placeholders(img)
+    except imaging.InvalidImage:
+        # Повторять бессмысленно — файл не является корректным изображением
+        IMAGE_PROCESSING_SECONDS.labels(outcome='invalid').observe(time.perf_counter() - started_at)
+        update(processing_status=Image.ProcessingStatus.FAILED)
+        return None
+    except Exception:
+        IMAGE_PROCESSING_SECONDS.labels(outcome='error').observe(time.perf_counter() - started_at)
+        max_attempts = getattr(context.task_result.task.get_backend(), 'max_attempts', 1)
+        if context.attempt >= max_attempts:
+            update(processing_status=Image.ProcessingStatus.FAILED)
+        raise
+    IMAGE_PROCESSING_SECONDS.labels(outcome='ok').observe(time.perf_counter() - started_at)
+
+    update(
+        width=width, height=height, placeholder=placeholder, dominant_color=color,
+        processing_status=Image.ProcessingStatus.READY
+    )
+    return {'width': width, 'height': height, 'placeholder': placeholder, 'dominant_color': color}
+
+
+@task(priority=-10)
+def delete_media_files(paths):
+    """
+    Удаляет файлы с диска и затем опустевшие директории.
+    Итог пишется в лог одной строкой на всю пачку.
+    """
+    removed = 0
+    directories = set()
+    for file_path in paths:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            FILES_REMOVED.inc()
+            removed += 1
+        directories.add(os.path.dirname(file_path))
+
+    removed_directories = sum(cleanup_empty_directories(directory) for directory in directories)
+    logger.info(
+        'Удалено файлов: %d из %d, пустых директорий: %d',
+        removed, len(paths), removed_directories,
+        extra={'files_removed': removed, 'files_requested': len(paths), 'directories_removed': removed_directories},
+    )
+    return {'removed': removed, 'directories_removed': removed_directories}
+
+
+def cleanup_empty_directories(path, max_depth=3):
+    """
+    Рекурсивно удаляет пустые директории, поднимаясь вверх по пути.
+    max_depth - ограничивает, как далеко вверх можно подниматься.
+    Возвращает количество удалённых директорий.
+    """
+    if max_depth <= 0:
+        return 0
+
+    path = Path(path)
+
+    # Проверяем, существует ли директория
+    if not path.exists() or not path.is_dir():
+        return 0
+
+    try:
+        # Если директория пуста
+        if not any(path.iterdir()):
+            # Удаляем её
+            path.rmdir()
+
+            # Поднимаемся на уровень выше и пробуем удалить родителя
+            return 1 + cleanup_empty_directories(path.parent, max_depth - 1)
+    except (OSError, PermissionError):
+        # Если не удалось удалить (например, директория не пуста или нет прав)
+        pass
+    return 0
+
+
+class _RemovalBatch:
+    """Файлы, удаляемые в одной транзакции; уходят одной задачей после коммита"""
+
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self):
+        delete_media_files.enqueue(self.paths)
+
+
+# Подключения к базе у каждого потока свои, поэтому и текущая пачка — своя
+_local = threading.local()
+
+
+def schedule_file_removal(file_path):
+    """
+    Ставит файл в очередь на удаление после коммита текущей транзакции.
+    Все файлы одной транзакции (например, массового удаления в админке)
+    попадают в одну задачу. При откате транзакции файлы не удаляются.
+    """
+    FILES_SCHEDULED_FOR_REMOVAL.inc()
+    if not connection.in_atomic_block:
+        delete_media_files.enqueue([file_path])
+        return
+
+    # Пачка ещё ждёт коммита этой транзакции, если её колбэк не выполнен и не отброшен
+    batch = getattr(_local, 'batch', None)
+    if batch is None or not any(callback is batch for _, callback, _ in connection.run_on_commit):
+        batch = _local.batch = _RemovalBatch()
+        connection.on_commit(batch)
+    batch.paths.append(file_path)
@@ -0,0 +1,33 @@
+"""
+Запуск тестов (manage.py test).
+
+С настроенными репликами (DB_REPLICA_HOSTS) роутер отправлял бы чтения на
+replica_N, а тестовым классам пришлось бы разрешать эту базу в databases.
+Поэтому на время тестов чтения идут на основную базу; тесты реплик включают
+их сами через override_settings(DATABASE_REPLICAS=...).
+
+Кэши на время тестов — в памяти процесса: общий файловый кэш (или таблица)
+остаётся за сервером разработки, и тестовые страницы и версии ключей
+в него не попадают.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.settings_override = override_settings(
+            DATABASE_REPLICAS=[],
+            CACHES={
+                alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'test:{alias}'}
+                for alias in settings.CACHES
+            },
+        )
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,855 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import warnings
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.db.models import Max, Sum
+from django.tasks import default_task_backend
+from django.http import FileResponse, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PilImage
+
+from . import imaging, page_cache, placeholders, reencoding, storage_stats
+from .apps import start_log_listener, stop_log_listener
+from .benchmarks import compare_results
+
+from .exports import iter_export
+from .logfmt import LogfmtFormatter
+from .imaging import DecodeBudgetTimeout, ImageTooLarge, MemoryBudget, decode, open_image
+from .middleware import ReplicaPinningMiddleware
+from .partitioning import MediaPartitioner, add_months, month_start
+from .models import File, Image, QueuedTask, SiteConfiguration, StorageUsage
+from .query_stats import collect_queries
+from .routers import ReplicaRouter, is_pinned_to_primary, pin_to_primary, read_replica, use_primary
+from .site_config import get_site_config, invalidate_site_config
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Выбор базы роутером без реальных подключений"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        pin_to_primary(False)
+
+    def test_media_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Image), 'replica_1')
+        self.assertEqual(self.router.db_for_read(File), 'replica_1')
+
+    def test_other_models_use_default(self):
+        self.assertIsNone(self.router.db_for_read(Group))
+
+    def test_write_pins_reads_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Image), 'default')
+        self.assertTrue(is_pinned_to_primary())
+        self.assertIsNone(self.router.db_for_read(Image))
+
+    def test_use_primary_is_scoped(self):
+        with use_primary():
+            self.assertIsNone(self.router.db_for_read(Image))
+        self.assertEqual(self.router.db_for_read(Image), 'replica_1')
+
+    def test_read_replica_ignores_pin(self):
+        pin_to_primary(True)
+        self.assertEqual(read_replica(), 'replica_1')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(read_replica(), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertIsNone(self.router.db_for_read(Image))
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_middleware(self, request, view=None):
+        middleware = ReplicaPinningMiddleware(view or (lambda request: HttpResponse()))
+        return middleware(request)
+
+    def test_read_only_request_is_not_pinned(self):
+        response = self.run_middleware(self.factory.get('/'))
+        self.assertNotIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+        self.assertFalse(is_pinned_to_primary())
+
+    def test_write_sets_pin_cookie(self):
+        def view(request):
+            ReplicaRouter().db_for_write(Image)
+            return HttpResponse()
+
+        response = self.run_middleware(self.factory.get('/'), view)
+        cookie = response.cookies[ReplicaPinningMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 5)
+
+    def test_cookie_pins_next_request(self):
+        request = self.factory.get('/')
+        request.COOKIES[ReplicaPinningMiddleware.cookie_name] = '1'
+        response = self.run_middleware(request)
+        self.assertTrue(is_pinned_to_primary())
+        # Cookie не продлевается, иначе закрепление никогда не закончится
+        self.assertNotIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+
+    def test_unsafe_methods_read_from_primary(self):
+        self.run_middleware(self.factory.post('/'))
+        self.assertTrue(is_pinned_to_primary())
+
+
+# Настроенные реплики: на время тестов core.test_runner убирает их из DATABASE_REPLICAS
+REPLICA_ALIASES = [alias for alias in settings.DATABASES if alias != 'default']
+
+
+@skipUnless(REPLICA_ALIASES, 'Реплики не настроены (DB_REPLICA_HOSTS)')
+@override_settings(DATABASE_REPLICAS=REPLICA_ALIASES)
+class ReplicaDatabaseTests(TestCase):
+    """
+    Проверка на двух подключениях.
+    Локально: DB_REPLICA_HOSTS=localhost python manage.py test core —
+    реплика становится зеркалом тестовой базы.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        pin_to_primary(False)
+        self.replica = REPLICA_ALIASES[0]
+
+    def test_reads_hit_replica_connection(self):
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            list(Image.objects.all())
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_export_reads_replica_in_pinned_request(self):
+        # Действие админки — POST: запрос закреплён за основной базой, а выгрузка всё равно идёт с реплики
+        pin_to_primary(True)
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            ''.join(iter_export(File.objects.all(), 'csv'))
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_reads_after_write_hit_primary(self):
+        File.objects.filter(pk=0).update(name='x')
+        with CaptureQueriesContext(connections['default']) as primary_queries:
+            list(File.objects.all())
+        self.assertEqual(len(primary_queries), 1)
+
+
+class StreamingExportTests(TestCase):
+
+    def setUp(self):
+        File.objects.bulk_create([
+            File(name=f'Документ {i}', file=f'files/doc{i}.pdf', file_type='PDF', file_size=i)
+            for i in range(3)
+        ])
+
+    def test_csv_header_comes_first(self):
+        chunks = iter_export(File.objects.order_by('pk'), 'csv', fields=('name', 'file_size'))
+        self.assertEqual(next(chunks), 'name,file_size\r\n')
+        self.assertEqual(''.join(chunks).splitlines(), ['Документ 0,0', 'Документ 1,1', 'Документ 2,2'])
+
+    def test_command_writes_to_stdout(self):
+        stdout = io.StringIO()
+        call_command('export_catalog', 'file', format='jsonl', stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['name'], 'Документ 0')
+
+    def test_jsonl_one_object_per_line(self):
+        content = ''.join(iter_export(File.objects.order_by('pk'), 'jsonl', fields=('name',)))
+        self.assertEqual(content.splitlines()[0], '{"name": "Документ 0"}')
+        self.assertEqual(len(content.splitlines()), 3)
+
+
+class PartitionMonthTests(SimpleTestCase):
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 2), date(2026, 1, 1))
+        self.assertEqual(add_months(date(2026, 12, 1), 1), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -13), date(2024, 12, 1))
+
+    def test_month_start(self):
+        self.assertEqual(month_start(date(2026, 2, 28)), date(2026, 2, 1))
+        self.assertEqual(month_start(datetime(2026, 1, 31, 23, 30, tzinfo=dt_timezone.utc)), date(2026, 1, 1))
+
+    def test_partition_bounds_are_utc(self):
+        partitioner = MediaPartitioner(connections['default'], 'core_image')
+        self.assertEqual(partitioner.partition_name(date(2025, 12, 1)), 'core_image_p2025_12')
+        sql = partitioner._create_partition_sql(date(2025, 12, 1))
+        self.assertIn("FROM ('2025-12-01 00:00:00+00') TO ('2026-01-01 00:00:00+00')", sql)
+
+
+@skipUnless(connections['default'].vendor == 'postgresql', 'Секционирование есть только в PostgreSQL')
+class PartitionMediaTests(TestCase):
+    """DDL в PostgreSQL транзакционный — TestCase откатывает и преобразование таблиц"""
+
+    def partition_sql(self, table, month):
+        return MediaPartitioner(connections['default'], table)._create_partition_sql(month) + ';'
+
+    def count(self, table):
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {connections["default"].ops.quote_name(table)}')
+            return cursor.fetchone()[0]
+
+    def test_dry_run_prints_sql_without_changes(self):
+        stdout = io.StringIO()
+        call_command('partition_media', convert=True, dry_run=True, months_ahead=1, stdout=stdout)
+
+        output = stdout.getvalue()
+        this_month = month_start(timezone.now())
+        for table in ('core_image', 'core_file'):
+            self.assertIn(f'ALTER TABLE "{table}" RENAME TO "{table}_legacy";', output)
+            self.assertIn(f'ALTER TABLE "{table}" ADD CONSTRAINT', output)
+            self.assertIn(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT;', output)
+            self.assertIn(self.partition_sql(table, this_month), output)
+            self.assertIn(self.partition_sql(table, add_months(this_month, 1)), output)
+            self.assertNotIn(self.partition_sql(table, add_months(this_month, 2)), output)
+            self.assertFalse(MediaPartitioner(connections['default'], table).is_partitioned())
+        self.assertIn('INCLUDING COMMENTS) PARTITION BY RANGE (created_at);', output)
+        self.assertIn('PRIMARY KEY (id, created_at, is_active);', output)
+
+    def test_convert_and_archive(self):
+        File.objects.bulk_create([
+            File(name=f'Документ {i}', file=f'files/doc{i}.pdf', file_type='PDF', file_size=i, is_active=i != 0)
+            for i in range(3)
+        ])
+        old = timezone.now() - timedelta(days=400)
+        File.objects.filter(name__in=['Документ 0', 'Документ 1']).update(created_at=old)
+
+        call_command(
+            'partition_media', convert=True, archive=True, months_ahead=1, archive_after_days=30,
+            stdout=io.StringIO(),
+        )
+
+        partitioner = MediaPartitioner(connections['default'], 'core_file')
+        self.assertTrue(partitioner.is_partitioned())
+        old_partition = partitioner.partition_name(month_start(old))
+        self.assertTrue(partitioner.is_partitioned(old_partition))
+        self.assertEqual(self.count(old_partition + '_archive'), 1)
+        self.assertEqual(self.count(old_partition + '_active'), 1)
+        self.assertTrue(partitioner.exists(partitioner.partition_name(add_months(month_start(timezone.now()), 1))))
+        # Данные и последовательность id пережили преобразование
+        self.assertEqual(File.objects.count(), 3)
+        self.assertEqual(File.objects.get(name='Документ 0').is_active, False)
+        [new] = File.objects.bulk_create([File(name='Новый', file='files/new.pdf', file_type='PDF', file_size=1)])
+        self.assertGreater(new.pk, File.objects.exclude(pk=new.pk).aggregate(last=Max('pk'))['last'])
+
+
+def make_png(name='test.png', size=(20, 10)):
+    buffer = io.BytesIO()
+    PilImage.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class MediaRootMixin:
+    """Загруженные в тестах файлы пишутся во временный MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+
+class LocMemCachesMixin:
+    """Каждый тест получает свои пустые кэши в памяти вместо общих (файловых)"""
+
+    def setUp(self):
+        super().setUp()
+        caches_override = override_settings(CACHES={
+            alias: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'{self.id()}:{alias}',
+            }
+            for alias in settings.CACHES
+        })
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+        # Записи LocMemCache живут в памяти процесса до конца прогона
+        self.addCleanup(self.clear_caches)
+
+    def clear_caches(self):
+        for cache in caches.all():
+            cache.clear()
+
+
+class StorageUsageTests(MediaRootMixin, TestCase):
+
+    def counters(self):
+        return sorted(
+            StorageUsage.objects.filter(files_count__gt=0)
+            .values_list('model_name', 'file_type', 'month', 'is_active', 'files_count', 'total_bytes')
+        )
+
+    def test_incremental_counters_match_rebuild(self):
+        image = Image.objects.create(image=make_png())
+        document = File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF-1.4 data'))
+        File.objects.create(name='Заметки', file=SimpleUploadedFile('notes.txt', b'hello'))
+
+        image.is_active = False
+        image.save()
+        document.file = SimpleUploadedFile('report.docx', b'x' * 100)
+        document.save()
+        document.delete()
+
+        incremental = self.counters()
+        storage_stats.rebuild()
+        self.assertEqual(incremental, self.counters())
+
+    def test_migration_populates_existing_rows(self):
+        Image.objects.create(image=make_png())
+        File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF-1.4 data'))
+        expected = self.counters()
+        # Как при первом применении 0002: записи уже есть, таблица счётчиков пуста
+        StorageUsage.objects.all().delete()
+        migration = importlib.import_module('core.migrations.0002_storageusage')
+        migration.populate_storage_usage(django_apps, None)
+        self.assertEqual(self.counters(), expected)
+
+    def test_dashboard_renders(self):
+        File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF-1.4 data'))
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:core_storageusage_changelist'))
+        self.assertContains(response, 'Отчёт')
+
+
+class SiteConfigurationTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        invalidate_site_config()
+
+    def test_hot_path_makes_no_queries(self):
+        get_site_config()
+        with self.assertNumQueries(0):
+            for _ in range(100):
+                get_site_config()
+
+    @override_settings(SITE_CONFIG_LOCAL_TTL=0)
+    def test_save_publishes_new_version(self):
+        self.assertEqual(get_site_config().max_file_size_mb, 50)
+        config = SiteConfiguration.get_solo()
+        config.max_file_size_mb = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+        self.assertEqual(get_site_config().max_file_size_mb, 1)
+
+    def test_upload_validators_use_limits(self):
+        config = SiteConfiguration.get_solo()
+        config.max_file_size_mb = 1
+        config.max_image_pixels = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+
+        document = File(name='Большой', file=SimpleUploadedFile('big.pdf', b'x' * (1024 * 1024 + 1)))
+        with self.assertRaisesMessage(ValidationError, 'Файл больше 1 МБ'):
+            document.full_clean()
+
+        image = Image(image=make_png(size=(20, 10)))
+        with self.assertRaisesMessage(ValidationError, 'Слишком большое разрешение'):
+            image.full_clean()
+
+
+class BackgroundTaskTests(MediaRootMixin, TestCase):
+
+    def run_queued_tasks(self):
+        for task_id in default_task_backend.claim('test-worker', ['default'], 100):
+            default_task_backend.run(task_id)
+
+    def test_upload_is_processed_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(image=make_png(size=(20, 10)))
+        self.assertEqual(image.processing_status, Image.ProcessingStatus.PENDING)
+        self.assertIsNone(image.width)
+
+        self.run_queued_tasks()
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (20, 10))
+        self.assertEqual(image.processing_status, Image.ProcessingStatus.READY)
+        # Заглушка для ленивой загрузки: BlurHash 4×3 компоненты и цвет
+        self.assertEqual(len(image.placeholder), 28)
+        self.assertEqual(image.dominant_color, '#ff0000')
+
+    def test_broken_image_is_marked_failed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(image=SimpleUploadedFile('broken.png', b'not an image'))
+        self.run_queued_tasks()
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, Image.ProcessingStatus.FAILED)
+
+    def test_transient_error_is_retried(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(image=make_png())
+        shutil.rmtree(self.media_root)
+
+        self.run_queued_tasks()
+        task = QueuedTask.objects.get()
+        self.assertEqual(task.status, QueuedTask.Status.READY)
+        self.assertIsNotNone(task.run_after)
+        self.assertEqual(len(task.errors), 1)
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, Image.ProcessingStatus.PENDING)
+
+    def test_bulk_delete_removes_files_in_one_task(self):
+        documents = [
+            File.objects.create(name=f'Документ {i}', file=SimpleUploadedFile(f'doc{i}.txt', b'text'))
+            for i in range(3)
+        ]
+        paths = [document.file.path for document in documents]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            File.objects.all().delete()
+
+        task = QueuedTask.objects.get()
+        self.assertEqual(sorted(task.args[0]), sorted(paths))
+        self.run_queued_tasks()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+
+class MediaApiTests(LocMemCachesMixin, MediaRootMixin, TestCase):
+
+    async def test_list_and_detail(self):
+        document = await File.objects.acreate(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF'))
+        await File.objects.acreate(name='Скрытый', file=SimpleUploadedFile('hidden.pdf', b'%PDF'), is_active=False)
+
+        response = await self.async_client.get(reverse('core:file_list'))
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Отчёт'])
+
+        response = await self.async_client.get(
+            reverse('core:file_detail', args=[document.pk]), {'fields': 'id,file_type'}
+        )
+        self.assertEqual(response.json(), {'id': document.pk, 'file_type': 'PDF'})
+
+        response = await self.async_client.get(reverse('core:file_list'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_cursor_pagination(self):
+        for i in range(5):
+            await File.objects.acreate(name=f'Документ {i}', file=SimpleUploadedFile(f'doc{i}.txt', b'x'))
+        await File.objects.filter(name__in=['Документ 1', 'Документ 2']).aupdate(created_at=timezone.now())
+
+        names, cursor = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'name'}
+            if cursor:
+                params['cursor'] = cursor
+            data = (await self.async_client.get(reverse('core:file_list'), params)).json()
+            names.extend(item['name'] for item in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(names), [f'Документ {i}' for i in range(5)])
+
+        data = (await self.async_client.get(reverse('core:file_list'), {'file_type': 'PDF'})).json()
+        self.assertEqual(data['results'], [])
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    async def test_cache_refill_reads_from_primary(self):
+        await File.objects.acreate(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF'))
+        # Следующий запрос после сброса кэша сам ничего не писал, но кэш заполняет с основной базы:
+        # чтение с replica_1 здесь запрещено (TestCase.databases)
+        pin_to_primary(False)
+        response = await self.async_client.get(reverse('core:file_list'), {'fields': 'name'})
+        self.assertEqual(response.json()['results'], [{'name': 'Отчёт'}])
+
+    def test_date_filters_use_aware_datetimes(self):
+        File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF'))
+        url = reverse('core:file_list')
+        today = timezone.localdate().isoformat()
+        # Наивная дата в фильтре по DateTimeField дала бы RuntimeWarning
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            after = self.client.get(url, {'created_after': today, 'fields': 'name'}).json()
+            before = self.client.get(url, {'created_before': today, 'fields': 'name'}).json()
+        self.assertEqual(after['results'], [{'name': 'Отчёт'}])
+        self.assertEqual(before['results'], [])
+        self.assertEqual(self.client.get(url, {'created_after': '2026-13-01'}).status_code, 400)
+
+    def test_unchanged_list_returns_304(self):
+        document = File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF'))
+        url = reverse('core:file_list')
+        etag = self.client.get(url)['ETag']
+
+        # Ответ с ETag уже в кэше страниц — база не нужна вовсе
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Сохранение сбрасывает ключи file:<id> и file-list после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            document.name = 'Новый отчёт'
+            document.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Новый отчёт')
+
+    async def test_download_streams_file(self):
+        content = b'x' * 200_000
+        document = await File.objects.acreate(name='Данные', file=SimpleUploadedFile('data.txt', content))
+        response = await self.async_client.get(reverse('core:file_download', args=[document.pk]))
+        self.assertEqual(response['Content-Length'], str(len(content)))
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), content)
+
+        document.is_active = False
+        await document.asave()
+        response = await self.async_client.get(reverse('core:file_download', args=[document.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_download_under_wsgi_is_file_response(self):
+        content = b'x' * 200_000
+        document = File.objects.create(name='Данные', file=SimpleUploadedFile('data.txt', content))
+        response = self.client.get(reverse('core:file_download', args=[document.pk]))
+        # Синхронный итератор по файлу, а не собранный в память асинхронный
+        self.assertIsInstance(response, FileResponse)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Length'], str(len(content)))
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+    def test_svg_is_sandboxed_attachment(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        image = Image.objects.create(
+            title='Логотип', image=SimpleUploadedFile('logo.svg', svg, content_type='image/svg+xml')
+        )
+        response = self.client.get(reverse('core:image_download', args=[image.pk]))
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+        self.assertEqual(b''.join(response.streaming_content), svg)
+
+
+class QueryStatsTests(LocMemCachesMixin, MediaRootMixin, TestCase):
+
+    def test_repeated_queries_are_detected(self):
+        documents = [
+            File.objects.create(name=f'Документ {i}', file=SimpleUploadedFile(f'doc{i}.txt', b'x'))
+            for i in range(5)
+        ]
+        with collect_queries() as collector:
+            for document in documents:
+                File.objects.get(pk=document.pk)
+            list(File.objects.filter(pk__in=[document.pk for document in documents]))
+        self.assertEqual(collector.count, 6)
+        [(sql, count)] = collector.repeated(threshold=5)
+        self.assertEqual(count, 5)
+        self.assertIn('WHERE "core_file"."id" = %s', sql)
+
+    @override_settings(QUERY_STATS_HEADERS=True)
+    def test_headers(self):
+        response = self.client.get(reverse('core:file_list'))
+        # Агрегат для ETag и сама страница
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+
+class MetricsTests(MediaRootMixin, TestCase):
+
+    def test_metrics_endpoint(self):
+        File.objects.create(name='Отчёт', file=SimpleUploadedFile('report.pdf', b'%PDF'))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'cms_media_save_seconds_count{model="file"}')
+        self.assertContains(response, 'cms_signal_handler_seconds_count{handler="update_storage_usage_on_save"}')
+
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+    def test_proxied_request_is_rejected(self):
+        # За прокси REMOTE_ADDR — адрес самого прокси
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret', HTTP_X_FORWARDED_FOR='203.0.113.5'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+
+    def test_regressions(self):
+        baseline = {'results': {
+            'fast': {'median': 0.010, 'queries': 3},
+            'slow': {'median': 0.010, 'queries': 3},
+            'chatty': {'median': 0.010, 'queries': 3},
+        }}
+        current = {'results': {
+            'fast': {'median': 0.011, 'queries': 3},
+            'slow': {'median': 0.020, 'queries': 3},
+            'chatty': {'median': 0.010, 'queries': 4},
+            'new': {'median': 0.010},
+        }}
+        lines, regressions = compare_results(baseline, current, threshold=0.2)
+        self.assertEqual(regressions, ['slow', 'chatty'])
+        self.assertEqual(len(lines), 4)
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    # Команда сама создаёт и удаляет отдельную тестовую базу
+    databases = {'default'}
+
+    def test_benchmarks_run_at_small_scale(self):
+        # benchmark вызывает setup_test_environment сам, а повторный вызов запрещён
+        debug = settings.DEBUG
+        teardown_test_environment()
+        self.addCleanup(setup_test_environment, debug=debug)
+        stdout = io.StringIO()
+        call_command('benchmark', scale=5, repeat=1, stdout=stdout, stderr=io.StringIO())
+
+        results = json.loads(stdout.getvalue())['results']
+        self.assertIn('user_save[username_from_email]', results)
+        self.assertIn('bulk_delete', results)
+
+
+@skipUnless(connections['default'].vendor == 'postgresql', 'COPY есть только в PostgreSQL')
+class SeedDataTests(TestCase):
+
+    def test_seed_is_consistent(self):
+        call_command('seed_data', images=30, files=20, users=40, no_files=True, stdout=io.StringIO())
+
+        self.assertEqual(Image.objects.count(), 30)
+        self.assertEqual(File.objects.count(), 20)
+        self.assertEqual(StorageUsage.objects.aggregate(total=Sum('files_count'))['total'], 50)
+        # Флаги соответствуют роли, как после User.save()
+        User = get_user_model()
+        for user in User.objects.all():
+            self.assertEqual((user.is_staff, user.is_superuser), User.role_flags(user.role))
+        # Последовательности не сбиты: новая запись получает следующий id
+        [document] = File.objects.bulk_create([File(name='Новый', file='files/new.pdf')])
+        self.assertEqual(document.pk, File.objects.aggregate(last=Max('pk'))['last'])
+
+
+class StaticAssetsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        storages = {**settings.STORAGES, 'staticfiles': {
+            'BACKEND': 'core.static_assets.CompressedManifestStaticFilesStorage',
+        }}
+        settings_override = override_settings(STATIC_ROOT=self.static_root, STORAGES=storages)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Без крупных сторонних библиотек: brotli с максимальным сжатием медленный
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['vendor'])
+
+    def test_brotli_is_not_imported_at_startup(self):
+        code = 'import sys, django; django.setup(); import config.urls; print("brotli" in sys.modules)'
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_hashed_compressed_immutable(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        hashed_name = staticfiles_storage.stored_name('admin/css/base.css')
+        self.assertNotEqual(hashed_name, 'admin/css/base.css')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, hashed_name + '.gz')))
+
+        response = self.client.get(f'/static/{hashed_name}', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        # Без хеша в имени — обычная перепроверка, без сжатия — исходный файл
+        response = self.client.get('/static/admin/css/base.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class ReencodeImagesTests(MediaRootMixin, TestCase):
+
+    def test_bmp_is_replaced_with_webp(self):
+        buffer = io.BytesIO()
+        PilImage.radial_gradient('L').convert('RGB').save(buffer, 'BMP')
+        image = Image.objects.create(image=SimpleUploadedFile('photo.bmp', buffer.getvalue()))
+        Image.objects.filter(pk=image.pk).update(processing_status=Image.ProcessingStatus.READY)
+        bmp_size = image.file_size
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reencode_images', workers=1, min_size=0, keep_originals=True, stdout=io.StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(image.file_type, 'WEBP')
+        self.assertTrue(image.image.name.endswith('photo.webp'))
+        self.assertEqual(image.file_size, os.path.getsize(image.image.path))
+        self.assertLess(image.file_size, bmp_size)
+        # Счётчики StorageUsage перенесены на новый тип и размер
+        usage = StorageUsage.objects.get(file_type='WEBP')
+        self.assertEqual((usage.files_count, usage.total_bytes), (1, image.file_size))
+        self.assertFalse(StorageUsage.objects.filter(file_type='BMP', files_count__gt=0).exists())
+
+    def test_decoding_goes_through_imaging_limits(self):
+        source = os.path.join(self.media_root, 'photo.png')
+        target = os.path.join(self.media_root, 'photo.webp')
+        PilImage.new('RGB', (20, 10), 'red').save(source)
+
+        with mock.patch.object(reencoding, '_max_pixels', 100):
+            with self.assertRaises(ImageTooLarge):
+                reencoding.reencode(source, target, 'webp', 80)
+        # Растр 20×10×4 байт не помещается в бюджет процесса
+        with mock.patch.object(imaging, 'budget', MemoryBudget(limit=100)):
+            with self.assertRaises(ImageTooLarge):
+                reencoding.reencode(source, target, 'webp', 80)
+        self.assertFalse(os.path.exists(target))
+        self.assertEqual(reencoding.reencode(source, target, 'webp', 80), os.path.getsize(target))
+
+
+class LogfmtTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        handler = logging.StreamHandler(self.stream)
+        config = settings.LOGGING['formatters']['structured']
+        handler.setFormatter(LogfmtFormatter(config['format'], style=config['style']))
+        self.logger = logging.getLogger('core.tests.logfmt')
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+
+    def test_extra_fields_reach_output(self):
+        self.logger.warning('Удалено файлов: %d', 3, extra={'files_removed': 3, 'path': 'media/a b.png'})
+        line = self.stream.getvalue().strip()
+        self.assertIn('level=WARNING logger=core.tests.logfmt', line)
+        self.assertTrue(line.endswith('Удалено файлов: 3 files_removed=3 path="media/a b.png"'), line)
+
+    def test_configured_queue_handler_writes_logfmt(self):
+        # Консольный обработчик за QueueHandler из LOGGING пишет в свой поток
+        console = logging.getHandlerByName('queue').listener.handlers[0]
+        stream = io.StringIO()
+        self.addCleanup(console.setStream, console.setStream(stream))
+
+        logging.getLogger('core.tests.queue').info('Удалено файлов: %d', 2, extra={'files_removed': 2})
+        # Остановка дописывает очередь до конца
+        stop_log_listener()
+        start_log_listener()
+
+        self.assertRegex(
+            stream.getvalue(),
+            r'level=INFO logger=core\.tests\.queue pid=\d+ Удалено файлов: 2 files_removed=2\n',
+        )
+
+
+@skipUnless(hasattr(os, 'fork'), 'Нужен os.fork')
+class LogListenerForkTests(SimpleTestCase):
+
+    def test_child_process_gets_running_listener(self):
+        read_fd, write_fd = os.pipe()
+        with warnings.catch_warnings():
+            # Python 3.12+ предупреждает о fork многопоточного процесса
+            warnings.simplefilter('ignore', DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:
+            # Дочерний процесс, как воркер gunicorn --preload: консольный обработчик пишет в трубу
+            try:
+                os.close(read_fd)
+                os.dup2(write_fd, 2)
+                logging.getLogger('core.tests.fork').warning('запись из дочернего процесса')
+                stop_log_listener()
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as pipe:
+            output = pipe.read().decode()
+        os.waitpid(pid, 0)
+        self.assertIn('logger=core.tests.fork', output)
+        self.assertIn('запись из дочернего процесса', output)
+
+
+class PlaceholderTests(SimpleTestCase):
+
+    def test_blurhash_matches_reference_implementation(self):
+        # Эталон — пакет blurhash 1.1.5 (порт алгоритма woltapp/blurhash на Python)
+        image = PilImage.new('RGB', (4, 3))
+        image.putdata([(x * 60, y * 100, (x + y) * 30) for y in range(3) for x in range(4)])
+        self.assertEqual(placeholders.blurhash(image), 'LcDJ|DCGFE?G*-M}SLv,dHeFfSeC')
+
+        image = PilImage.new('RGB', (8, 6))
+        image.putdata([
+            ((x * 37 + y * 11) % 256, (x * 5 + y * 41) % 256, (x * y * 13) % 256)
+            for y in range(6) for x in range(8)
+        ])
+        self.assertEqual(placeholders.blurhash(image, 3, 2), 'BgGSGCFp1sy{NaW=')
+
+    def test_dominant_color(self):
+        image = PilImage.new('RGB', (4, 4), (200, 30, 40))
+        image.paste((0, 0, 255), (0, 0, 1, 4))
+        self.assertEqual(placeholders.dominant_color(image), '#c81e28')
+
+
+class ImagingTests(SimpleTestCase):
+
+    def test_memory_budget(self):
+        budget = MemoryBudget(limit=1000)
+        with self.assertRaises(ImageTooLarge):
+            with budget.reserve(1001):
+                pass
+        with budget.reserve(600):
+            # Второй растр не помещается, пока первый в памяти
+            with self.assertRaises(DecodeBudgetTimeout):
+                with budget.reserve(600, timeout=0.01):
+                    pass
+            with budget.reserve(400, timeout=0):
+                self.assertEqual(budget.used, 1000)
+        self.assertEqual(budget.used, 0)
+
+    def test_jpeg_is_decoded_reduced(self):
+        buffer = io.BytesIO()
+        PilImage.new('RGB', (800, 600), 'blue').save(buffer, 'JPEG')
+        with open_image(buffer) as img, decode(img, size=(32, 32)) as decoded:
+            # DCT-масштабирование 1/8: растр 100×75 вместо 800×600
+            self.assertEqual(decoded.size, (100, 75))
+
+
+class PageCacheTests(LocMemCachesMixin, SimpleTestCase):
+
+    def test_purge_invalidates_only_tagged_entries(self):
+        calls = []
+
+        def produce(value):
+            return lambda: calls.append(value) or value
+
+        self.assertEqual(page_cache.get_or_set('a', ['image:1', 'image-list'], produce('a1')), 'a1')
+        self.assertEqual(page_cache.get_or_set('b', ['image:2'], produce('b1')), 'b1')
+        self.assertEqual(page_cache.get_or_set('a', ['image:1', 'image-list'], produce('a2')), 'a1')
+
+        page_cache.purge('image-list')
+        self.assertEqual(page_cache.get_or_set('a', ['image:1', 'image-list'], produce('a3')), 'a3')
+        self.assertEqual(page_cache.get_or_set('b', ['image:2'], produce('b2')), 'b1')
+        self.assertEqual(calls, ['a1', 'b1', 'a3'])
+
+    def test_refill_reads_from_primary(self):
+        pin_to_primary(False)
+        self.assertTrue(page_cache.get_or_set('a', ['image:1'], is_pinned_to_primary))
+        self.assertFalse(is_pinned_to_primary())
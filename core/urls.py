@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('images/', views.image_list, name='image_list'),
+    path('images/<int:pk>/', views.image_detail, name='image_detail'),
+    path('images/<int:pk>/download/', views.image_download, name='image_download'),
+    path('files/', views.file_list, name='file_list'),
+    path('files/<int:pk>/', views.file_detail, name='file_detail'),
+    path('files/<int:pk>/download/', views.file_download, name='file_download'),
+]
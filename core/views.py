@@ -1,3 +1,366 @@
-from django.shortcuts import render
+"""
+Публичный JSON API медиатеки (только чтение): список, метаданные и скачивание.
 
-# Create your views here.
+Все представления асинхронные: под ASGI (uvicorn) запрос не занимает
+поток на всё время ответа. Запросы к базе идут через асинхронный ORM,
+а чтение файла — кусками в пуле потоков (asyncio.to_thread), поэтому
+медленные скачивания держат только корутину, а не поток. Под WSGI
+асинхронный итератор Django собрал бы в память целиком, поэтому там
+файл отдаёт обычный FileResponse.
+
+SVG — активное содержимое (в нём может быть <script>): загруженные
+пользователями SVG отдаются только вложением и с CSP sandbox.
+
+Параметры списков:
+    ?cursor=...           — продолжение с места, где закончилась прошлая страница
+    ?limit=50             — размер страницы (не больше MAX_PAGE_SIZE)
+    ?fields=id,title,url  — отдавать только эти поля (из базы читаются только они)
+    фильтры как в list_filter админки и ?created_after= / ?created_before=
+
+Списки и карточки отдаются с ETag; если данные не менялись,
+на If-None-Match отвечаем 304 без чтения и сериализации записей.
+Готовые ответы кэшируются (core.page_cache) под ключами image:<id>, image-list
+и т.п. и сбрасываются при изменении записей — повторный запрос не идёт в базу.
+"""
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+from datetime import datetime, time
+from functools import wraps
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import BadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, Q
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import content_disposition_header, quote_etag
+from django.views.decorators.http import require_safe
+
+from . import page_cache
+from .models import File, Image
+from .routers import use_primary
+
+
+# Размер куска при чтении файла для отдачи клиенту
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Размер страницы списка по умолчанию и максимальный
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Порядок выдачи; курсор — значения этих полей у последней записи страницы.
+# Поддерживается индексом *_created_idx
+ORDERING = ('-created_at', '-id')
+
+
+def _field(name):
+    return (name, attrgetter(name))
+
+
+# Поля API: имя -> (поле модели для .only(), функция получения значения)
+API_FIELDS = {
+    Image: {
+        'id': ('id', attrgetter('pk')),
+        'title': _field('title'),
+        'alt_text': _field('alt_text'),
+        'url': ('image', lambda image: image.image.url),
+        'width': _field('width'),
+        'height': _field('height'),
+        'placeholder': _field('placeholder'),
+        'dominant_color': _field('dominant_color'),
+        'file_size': _field('file_size'),
+        'file_type': _field('file_type'),
+        'processing_status': _field('processing_status'),
+        'created_at': _field('created_at'),
+        'updated_at': _field('updated_at'),
+    },
+    File: {
+        'id': ('id', attrgetter('pk')),
+        'name': _field('name'),
+        'description': _field('description'),
+        'url': ('file', lambda file: file.file.url),
+        'file_size': _field('file_size'),
+        'file_type': _field('file_type'),
+        'created_at': _field('created_at'),
+        'updated_at': _field('updated_at'),
+    },
+}
+
+# Фильтры — те же, что в list_filter админки (created_at — через диапазон дат)
+API_FILTERS = {
+    Image: ('file_type', 'is_active', 'processing_status'),
+    File: ('file_type', 'is_active'),
+}
+
+
+def api_view(view):
+    """GET/HEAD-представление API; ошибки в параметрах — ответ 400 в JSON"""
+    @require_safe
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+def _int_param(request, name, default, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        raise BadRequest(f'Параметр {name} должен быть числом')
+    return min(max(value, 1), maximum)
+
+
+def _bool_param(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise BadRequest(f'Ожидалось true или false, получено: {value}')
+
+
+def _date_param(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and (day := parse_date(value)) is not None:
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise BadRequest(f'Параметр {name} должен быть датой (ГГГГ-ММ-ДД)')
+    # Дата и время без смещения — в часовом поясе сайта (TIME_ZONE)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _selected_fields(request, model):
+    """Запрошенные поля API и соответствующие поля модели для .only()"""
+    api_fields = API_FIELDS[model]
+    requested = request.GET.get('fields')
+    if requested:
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in api_fields]
+        if unknown:
+            raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    else:
+        names = list(api_fields)
+
+    # created_at и updated_at нужны всегда: для курсора и ETag карточки
+    model_fields = {'id', 'created_at', 'updated_at'}
+    model_fields.update(api_fields[name][0] for name in names)
+    return {name: api_fields[name][1] for name in names}, model_fields
+
+
+def _serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
+
+
+def _encode_cursor(obj):
+    value = f'{obj.created_at.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = value.split('|')
+        created_at, pk = parse_datetime(created_at), int(pk)
+    except ValueError:
+        created_at = None
+    if created_at is None:
+        raise BadRequest('Некорректный курсор')
+    return created_at, pk
+
+
+async def _filtered_queryset(request, model):
+    """Записи модели с учётом фильтров; неактивные видит только персонал"""
+    queryset = model.objects.all()
+    user = await request.auser()
+    for name in API_FILTERS[model]:
+        value = request.GET.get(name)
+        if value is None:
+            continue
+        if name == 'is_active':
+            value = _bool_param(value)
+        queryset = queryset.filter(**{name: value})
+    if not user.is_staff:
+        queryset = queryset.filter(is_active=True)
+
+    created_after = _date_param(request, 'created_after')
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    created_before = _date_param(request, 'created_before')
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset, user
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest())
+
+
+async def _list_response(request, model):
+    fields, model_fields = _selected_fields(request, model)
+    limit = _int_param(request, 'limit', PAGE_SIZE, MAX_PAGE_SIZE)
+    cursor = request.GET.get('cursor')
+    queryset, user = await _filtered_queryset(request, model)
+
+    # ETag списка — по максимальному updated_at и количеству записей
+    # (количество ловит удаления). Одна агрегатная строка вместо чтения страницы.
+    stats = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('id'))
+    etag = _etag(stats['last_modified'], stats['count'], user.is_staff, request.GET.urlencode())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    if cursor:
+        created_at, pk = _decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+    page = [obj async for obj in queryset.only(*model_fields).order_by(*ORDERING)[:limit + 1]]
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+
+    response = JsonResponse({
+        'results': [_serialize(obj, fields) for obj in page[:limit]],
+        'next_cursor': next_cursor,
+    })
+    response['ETag'] = etag
+    return response
+
+
+async def _detail_response(request, model, pk):
+    fields, model_fields = _selected_fields(request, model)
+    queryset, user = await _filtered_queryset(request, model)
+    try:
+        obj = await queryset.only(*model_fields).aget(pk=pk)
+    except model.DoesNotExist:
+        raise Http404
+
+    etag = _etag(obj.updated_at, request.GET.urlencode())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    response = JsonResponse(_serialize(obj, fields))
+    response['ETag'] = etag
+    return response
+
+
+async def _cached_response(request, keys, produce):
+    """
+    Ответ из кэша страниц или produce(), сохранённый под ключами keys.
+    Персонал видит неактивные записи — его ответы кэшируются отдельно.
+    """
+    user = await request.auser()
+    name = f'{request.get_full_path()}|{user.is_staff}'
+    entry_key, response = await sync_to_async(page_cache.lookup)(name, keys)
+    if response is not None:
+        not_modified = get_conditional_response(request, etag=response.get('ETag'))
+        if not_modified is not None:
+            not_modified['ETag'] = response['ETag']
+            return not_modified
+        return response
+
+    # Ответ попадёт в кэш: читаем с основной базы, а не с отстающей реплики
+    with use_primary():
+        response = await produce()
+    # 304 и ошибки не кэшируем: 304 зависит от заголовков конкретного клиента
+    if response.status_code == 200:
+        await sync_to_async(page_cache.store)(entry_key, response)
+    return response
+
+
+async def _iter_file(field_file, chunk_size=STREAM_CHUNK_SIZE):
+    """Асинхронное чтение файла кусками; каждое обращение к диску — в пуле потоков"""
+    file = await asyncio.to_thread(field_file.storage.open, field_file.name, 'rb')
+    try:
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _file_response(request, field_file, as_attachment):
+    try:
+        size = await asyncio.to_thread(field_file.storage.size, field_file.name)
+    except FileNotFoundError:
+        raise Http404
+
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    is_svg = content_type == 'image/svg+xml'
+    if is_svg:
+        # Открытый в браузере SVG выполняет свои скрипты в контексте нашего домена
+        as_attachment = True
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_iter_file(field_file), content_type=content_type)
+    else:
+        # WSGI: синхронный файл — сервер читает его кусками или отдаёт через wsgi.file_wrapper
+        file = await asyncio.to_thread(field_file.storage.open, field_file.name, 'rb')
+        response = FileResponse(file, content_type=content_type)
+    response['Content-Length'] = str(size)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    if is_svg:
+        response['Content-Security-Policy'] = 'sandbox'
+    return response
+
+
+async def _get_active(model, pk):
+    try:
+        return await model.objects.aget(pk=pk, is_active=True)
+    except model.DoesNotExist:
+        raise Http404
+
+
+@api_view
+async def image_list(request):
+    """Список изображений"""
+    return await _cached_response(request, ['image-list'], lambda: _list_response(request, Image))
+
+
+@api_view
+async def image_detail(request, pk):
+    """Метаданные изображения"""
+    return await _cached_response(request, [f'image:{pk}'], lambda: _detail_response(request, Image, pk))
+
+
+@require_safe
+async def image_download(request, pk):
+    """Файл изображения"""
+    image = await _get_active(Image, pk)
+    return await _file_response(request, image.image, as_attachment=False)
+
+
+@api_view
+async def file_list(request):
+    """Список документов"""
+    return await _cached_response(request, ['file-list'], lambda: _list_response(request, File))
+
+
+@api_view
+async def file_detail(request, pk):
+    """Метаданные документа"""
+    return await _cached_response(request, [f'file:{pk}'], lambda: _detail_response(request, File, pk))
+
+
+@require_safe
+async def file_download(request, pk):
+    """Файл документа (как вложение)"""
+    file = await _get_active(File, pk)
+    return await _file_response(request, file.file, as_attachment=True)